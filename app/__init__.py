@@ -2,12 +2,16 @@ from flask import Flask
 from dotenv import load_dotenv
 from flask_cors import CORS
 from app.services.error_handler import register_error_handlers
+from app.services.helpers.pagination import PAGINATION_HEADERS
 import os
 
 def create_app():
     load_dotenv()
     app = Flask(__name__)
-    CORS(app)
+    CORS(app, expose_headers=PAGINATION_HEADERS)
+
+    from .services.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
 
     from .routes.auth import auth_bp
     from  .routes.placement_test import placement_test_bp
@@ -17,6 +21,10 @@ def create_app():
     from .routes.sections import sections_bp
     from .routes.analytics import analytics_bp
     from .routes.settings import settings_bp
+    from .commands import register_commands
+    from .services.compression import register_compression
+    from .services.metrics import register_metrics
+    from .services.query_detector import register_query_detector
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(placement_test_bp, url_prefix="/placement_test")
@@ -28,5 +36,9 @@ def create_app():
     app.register_blueprint(settings_bp, url_prefix="/settings")
 
     register_error_handlers(app)
+    register_metrics(app)
+    register_query_detector(app)
+    register_compression(app)
+    register_commands(app)
 
     return app
@@ -0,0 +1,44 @@
+import click
+
+from app.services.supabase_client import supabase
+from app.services.helpers.engagement import ENGAGEMENT_SCORE_VERSION, score_analytics_rows
+
+
+def register_commands(app):
+
+    @app.cli.command("backfill-engagement")
+    @click.option("--batch-size", default=500, show_default=True, help="Liczba wierszy na jedno zapytanie.")
+    @click.option("--all", "recompute_all", is_flag=True, help="Przelicz wszystkie wiersze, nie tylko nieaktualne.")
+    def backfill_engagement(batch_size, recompute_all):
+        """Przelicza zapisane wyniki zaangażowania po zmianie wzoru."""
+        updated = 0
+        last_id = None
+
+        while True:
+            query = supabase \
+                .from_("lesson_analytics") \
+                .select("*") \
+                .order("id") \
+                .limit(batch_size)
+
+            if last_id is not None:
+                query = query.gt("id", last_id)
+
+            if not recompute_all:
+                query = query.or_(f"engagement_version.is.null,engagement_version.lt.{ENGAGEMENT_SCORE_VERSION}")
+
+            rows = query.execute().data or []
+            if not rows:
+                break
+
+            for row, score in zip(rows, score_analytics_rows(rows)):
+                row["engagement_score"] = score
+                row["engagement_version"] = ENGAGEMENT_SCORE_VERSION
+
+            supabase.from_("lesson_analytics").upsert(rows).execute()
+
+            updated += len(rows)
+            last_id = rows[-1]["id"]
+            click.echo(f"Przeliczono {updated} wierszy")
+
+        click.echo(f"Gotowe - zaktualizowano {updated} wierszy (wersja {ENGAGEMENT_SCORE_VERSION})")
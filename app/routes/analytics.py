@@ -1,12 +1,19 @@
+import os
 from datetime import datetime
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
 from app.services.supabase_client import supabase
 from postgrest.exceptions import APIError
 from ..services.jwt_check import decode_jwt_token
 from collections import defaultdict, Counter
 from ..services.helpers.difficulty import compute_difficulty_factor
-from ..services.helpers.engagement import compute_engagement_score
+from ..services.helpers.engagement import ENGAGEMENT_SCORE_VERSION, ENGAGEMENT_COLUMNS_FEATURE, \
+    score_analytics_row, score_analytics_rows
+from ..services.query_executor import run_queries
+from ..services.query_cache import query_cache
+from ..services.rpc import call_rpc
+from ..services.schema_fallback import MISSING_COLUMN_CODES, with_schema_fallback
+from ..services.write_buffer import lesson_analytics_buffer
 
 
 def should_send_lesson_metrics(time_on_page, char_count, lesson_level='A1', user_difficulty=3):
@@ -30,6 +37,106 @@ def should_send_lesson_metrics(time_on_page, char_count, lesson_level='A1', user
 
 analytics_bp = Blueprint('analytics_bp', __name__)
 
+
+ENGAGEMENT_INPUT_COLUMNS = "expected_time, time_on_page, scroll_depth, clicks, mouse_moves, scrolls, difficulty"
+
+
+def _stored_engagement_scores(entries):
+    """Wyniki zapisane przy zapisie zdarzeń; dla starych wierszy liczone wsadowo na bieżąco."""
+    scores = [entry.get("engagement_score") for entry in entries]
+    missing = [i for i, score in enumerate(scores) if score is None]
+
+    if missing:
+        computed = score_analytics_rows([entries[i] for i in missing])
+        for i, score in zip(missing, computed):
+            scores[i] = score or 0
+
+    return scores
+
+
+def _get_class_info(class_id):
+    def load():
+        response = supabase.from_("classes").select("id, name").eq("id", class_id).maybe_single().execute()
+        return response.data if response else None
+
+    return query_cache.get_or_load("classes", {"id": class_id}, load, columns="id, name")
+
+
+ANALYTICS_BATCH_MAX_EVENTS = int(os.getenv("ANALYTICS_BATCH_MAX_EVENTS", 100))
+
+LESSON_READING_COLUMNS = "id, char_count, level"
+LESSON_READING_FALLBACK_COLUMNS = "id, level"
+
+
+def _get_lesson_reading_info(lesson_ids):
+    """Słownik str(id lekcji) -> {char_count, level} dla istniejących lekcji, z cache.
+
+    Bez migracji char_count wiersze mają tylko id i level.
+    """
+    lesson_ids = list(dict.fromkeys(str(lesson_id) for lesson_id in lesson_ids if lesson_id))
+    if not lesson_ids:
+        return {}
+
+    def get_many(columns):
+        return query_cache.get_many(
+            "lessons", "id", lesson_ids,
+            lambda missing: supabase.from_("lessons").select(columns).in_("id", missing).execute().data,
+            columns=columns
+        )
+
+    lessons = with_schema_fallback(
+        "kolumny lessons.char_count", MISSING_COLUMN_CODES,
+        lambda: get_many(LESSON_READING_COLUMNS),
+        lambda: get_many(LESSON_READING_FALLBACK_COLUMNS),
+        "długość lekcji liczona z treści zdarzenia"
+    )
+
+    return {str(lesson_id): lesson for lesson_id, lesson in lessons.items()}
+
+
+def _build_lesson_analytics_row(user_id, data, lesson=None):
+    """Wiersz lesson_analytics ze zdarzenia frontendu; None, gdy czas jest spoza zakresu.
+
+    Liczba znaków pochodzi z lekcji w bazie; `context` z requestu jest tylko
+    zapasem dla lekcji bez zapisanego char_count.
+    """
+    lesson = lesson or {}
+    char_count = lesson.get("char_count")
+    if char_count is None:
+        char_count = len(data.get("context", ""))
+
+    should_send, expected_time = should_send_lesson_metrics(
+        time_on_page=data.get("timeOnPage", 0),
+        char_count=char_count,
+        lesson_level=data.get("level") or lesson.get("level") or "A1",
+        user_difficulty=data.get("difficulty", 3)
+    )
+
+    if not should_send:
+        return None
+
+    analytics_data = {
+        "user_id": user_id,
+        "class_id": data.get("classId"),
+        "section_id": data.get("sectionId"),
+        "lesson_id": data.get("lessonId"),
+        "time_on_page": data.get("timeOnPage"),
+        "mouse_moves": data.get("mouseMoves"),
+        "scrolls": data.get("scrolls"),
+        "scroll_depth": data.get("scrollDepth"),
+        "clicks": data.get("clicks"),
+        "difficulty": data.get("difficulty"),
+        "level": data.get("level"),
+        "main_category": data.get("main_category"),
+        "sub_category": data.get("sub_category"),
+        "expected_time": expected_time
+    }
+    analytics_data["engagement_score"] = score_analytics_row(analytics_data)
+    analytics_data["engagement_version"] = ENGAGEMENT_SCORE_VERSION
+
+    return analytics_data
+
+
 @analytics_bp.route('/save_lesson_analytics', methods=['POST'])
 def create_lesson_analytics():
     auth_header = request.headers.get('Authorization')
@@ -42,37 +149,19 @@ def create_lesson_analytics():
     data = request.get_json()
 
     try:
-        should_send, expected_time = should_send_lesson_metrics(
-            time_on_page=data.get("timeOnPage", 0),
-            char_count=len(data.get("context", "")),
-            lesson_level=data.get("level", "A1"),
-            user_difficulty=data.get("difficulty", 3)
-        )
+        lesson_id = data.get("lessonId")
+        lesson = _get_lesson_reading_info([lesson_id]).get(str(lesson_id))
 
-        if not should_send:
-            return jsonify({"message": "Dane zostały pominięte — czas spoza zakresu."}), 200
+        # Zdarzenie dla nieistniejącej lekcji i tak zostałoby odrzucone przy zapisie (23503)
+        if lesson_id and lesson is None:
+            return jsonify({"error": "Lekcja nie została znaleziona."}), 404
 
-        analytics_data = {
-            "user_id": user_id,
-            "class_id": data.get("classId"),
-            "section_id": data.get("sectionId"),
-            "lesson_id": data.get("lessonId"),
-            "time_on_page": data.get("timeOnPage"),
-            "mouse_moves": data.get("mouseMoves"),
-            "scrolls": data.get("scrolls"),
-            "scroll_depth": data.get("scrollDepth"),
-            "clicks": data.get("clicks"),
-            "difficulty": data.get("difficulty"),
-            "level": data.get("level"),
-            "main_category": data.get("main_category"),
-            "sub_category": data.get("sub_category"),
-            "expected_time": expected_time
-        }
+        analytics_data = _build_lesson_analytics_row(user_id, data, lesson)
 
-        response = supabase \
-            .from_("lesson_analytics") \
-            .insert(analytics_data) \
-            .execute()
+        if analytics_data is None:
+            return jsonify({"message": "Dane zostały pominięte — czas spoza zakresu."}), 200
+
+        lesson_analytics_buffer.add(analytics_data)
 
         return jsonify({"message": "Dane analityczne zapisane poprawnie."}), 201
 
@@ -82,9 +171,74 @@ def create_lesson_analytics():
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
+
+@analytics_bp.route('/save_lesson_analytics_batch', methods=['POST'])
+def create_lesson_analytics_batch():
+    """Przyjmuje listę zdarzeń (lub {"events": [...]}) i zapisuje zaakceptowane jednym insertem."""
+    auth_header = request.headers.get('Authorization')
+    payload, error_message, status_code = decode_jwt_token(auth_header)
+
+    if not payload:
+        return jsonify({"error": error_message}), status_code
+
+    user_id = payload["sub"]
+    data = request.get_json(silent=True)
+    events = data.get("events") if isinstance(data, dict) else data
+
+    if not isinstance(events, list) or not events:
+        return jsonify({"error": "Oczekiwano niepustej listy zdarzeń"}), 400
+
+    if len(events) > ANALYTICS_BATCH_MAX_EVENTS:
+        return jsonify({"error": f"Maksymalnie {ANALYTICS_BATCH_MAX_EVENTS} zdarzeń w jednym żądaniu"}), 413
+
+    results = []
+    rows = []
+
+    try:
+        lessons = _get_lesson_reading_info(event.get("lessonId") for event in events if isinstance(event, dict))
+    except APIError as e:
+        return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
+
+    for index, event in enumerate(events):
+        try:
+            if not isinstance(event, dict):
+                raise ValueError("zdarzenie musi być obiektem")
+
+            lesson_id = event.get("lessonId")
+            lesson = lessons.get(str(lesson_id))
+            if lesson_id and lesson is None:
+                raise ValueError("lekcja nie istnieje")
+
+            row = _build_lesson_analytics_row(user_id, event, lesson)
+        except (TypeError, ValueError, AttributeError) as e:
+            results.append({"index": index, "status": "invalid", "error": str(e)})
+            continue
+
+        if row is None:
+            results.append({"index": index, "status": "skipped", "reason": "czas spoza zakresu"})
+        else:
+            rows.append(row)
+            results.append({"index": index, "status": "accepted"})
+
+    try:
+        lesson_analytics_buffer.add_many(rows)
+
+        return jsonify({
+            "accepted": len(rows),
+            "skipped": sum(1 for result in results if result["status"] == "skipped"),
+            "invalid": sum(1 for result in results if result["status"] == "invalid"),
+            "results": results,
+        }), 201 if rows else 200
+
+    except APIError as e:
+        return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
+
+    except Exception as e:
+        return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
+
+
 @analytics_bp.route('/get_lesson_engagement_score/<lesson_id>', methods=['GET'])
 def get_engagement_score(lesson_id):
-    print("sdafdsafasdfad")
     auth_header = request.headers.get('Authorization')
     payload, error_message, status_code = decode_jwt_token(auth_header)
 
@@ -98,39 +252,23 @@ def get_engagement_score(lesson_id):
 
     try:
 
-        response = supabase \
-            .from_("lesson_analytics") \
-            .select("*") \
-            .eq("lesson_id", lesson_id) \
-            .execute()
+        def select(columns):
+            return supabase.from_("lesson_analytics").select(columns).eq("lesson_id", lesson_id).execute().data
 
-        entries = response.data
+        # Bez migracji 001 wynik liczony jest z kolumn wejściowych (_stored_engagement_scores)
+        entries = with_schema_fallback(
+            ENGAGEMENT_COLUMNS_FEATURE, MISSING_COLUMN_CODES,
+            lambda: select("engagement_score, " + ENGAGEMENT_INPUT_COLUMNS),
+            lambda: select(ENGAGEMENT_INPUT_COLUMNS),
+            "wynik zaangażowania liczony przy odczycie"
+        )
 
         if not entries:
             return jsonify({"engagement_score": 0}), 200
 
         total_score = 0
 
-        for entry in entries:
-            expected = entry.get("expected_time")
-            time_on_page = entry.get("time_on_page")
-            scroll_depth = entry.get("scroll_depth")
-            clicks =entry.get("clicks")
-            moves = entry.get("mouse_moves")
-            scrolls = entry.get("scrolls")
-            difficulty = entry.get("difficulty")
-
-            # entry_score = (
-            #     (time_ratio * 0.4) +
-            #     (scroll_depth * 0.3) +
-            #     (clicks * 0.1) +
-            #     (moves * 0.1) +
-            #     (scrolls * 0.1)
-            # ) * 100
-
-            entry_score = compute_engagement_score(time_on_page, expected, scroll_depth, clicks ,moves, scrolls,difficulty )
-            print(entry_score)
-
+        for entry_score in _stored_engagement_scores(entries):
             total_score += min(entry_score, 100)
 
         engagement_score = int(total_score / len(entries))
@@ -153,22 +291,18 @@ def get_class_analytics(class_id):
         return jsonify({"error": error_message}), status_code
 
     try:
-        class_res = supabase \
-            .from_("classes") \
-            .select("id, name") \
-            .eq("id", class_id) \
-            .single() \
-            .execute()
-        class_info = class_res.data
+        results = run_queries(
+            class_info=lambda: _get_class_info(class_id),
+            analytics_res=supabase
+                .from_("lesson_analytics")
+                .select("*")
+                .eq("class_id", class_id)
+        )
+        class_info = results["class_info"]
         if not class_info:
             return jsonify({"error": "Nie znaleziono klasy"}), 404
 
-        analytics_res = supabase \
-            .from_("lesson_analytics") \
-            .select("*") \
-            .eq("class_id", class_id) \
-            .execute()
-        analytics_entries = analytics_res.data or []
+        analytics_entries = results["analytics_res"].data or []
 
         if not analytics_entries:
             return jsonify({
@@ -179,24 +313,26 @@ def get_class_analytics(class_id):
 
 
         lesson_ids = list({e["lesson_id"] for e in analytics_entries})
-        lessons_res = supabase \
-            .from_("lessons") \
-            .select("id, title, main_category, sub_category") \
-            .in_("id", lesson_ids) \
-            .execute()
-        lessons = {l["id"]: l for l in lessons_res.data or []}
-
         user_ids = list({e["user_id"] for e in analytics_entries})
-        users_res = supabase \
-            .from_("users") \
-            .select("id, name") \
-            .in_("id", user_ids) \
-            .execute()
-        users = {u["id"]: u["name"] for u in users_res.data or []}
+        results = run_queries(
+            lessons_res=supabase
+                .from_("lessons")
+                .select("id, title, main_category, sub_category")
+                .in_("id", lesson_ids),
+            users=lambda: query_cache.get_many(
+                "users", "id", user_ids,
+                lambda missing: supabase.from_("users").select("id, name").in_("id", missing).execute().data,
+                columns="id, name"
+            )
+        )
+        lessons = {l["id"]: l for l in results["lessons_res"].data or []}
+        users = {user_id: u["name"] for user_id, u in results["users"].items()}
 
         lessons_output = {}
 
-        for entry in analytics_entries:
+        engagement_scores = _stored_engagement_scores(analytics_entries)
+
+        for entry, engagement_score in zip(analytics_entries, engagement_scores):
             lesson_id = entry["lesson_id"]
             lesson = lessons.get(lesson_id, {})
             user_id = entry["user_id"]
@@ -204,16 +340,7 @@ def get_class_analytics(class_id):
 
             expected = entry.get("expected_time")
             time_on_page = entry.get("time_on_page")
-            scroll_depth =entry.get("scroll_depth")
-            clicks = entry.get("clicks", )
-            mouse_moves =entry.get("mouse_moves")
-            scrolls = entry.get("scrolls")
             difficulty = entry.get("difficulty")
-            time_ratio = min(time_on_page / expected, 2.0) if expected else 0
-            # engagement_score = round(((time_ratio * 0.6) + (clicks / 20 * 0.4)) * 100, 2)
-            engagement_score = compute_engagement_score(time_on_page,expected, scroll_depth,clicks, mouse_moves, scrolls, difficulty )
-
-
 
             if lesson_id not in lessons_output:
                 lessons_output[lesson_id] = {
@@ -268,6 +395,64 @@ def get_class_analytics(class_id):
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
+def _aggregate_subcategory_stats(user_ids, level):
+    """Ścieżka zapasowa dla class_performance_by_subcategory - grupowanie wyników w Pythonie."""
+    task_results_res = supabase \
+        .from_("task_results") \
+        .select("""
+            task_points, 
+            task_error, 
+            task_uncertainty,
+            difficulty,
+            user_id,
+            tasks!inner (
+                main_category,
+                sub_category,
+                level
+            )
+        """) \
+        .in_("user_id", user_ids) \
+        .eq("tasks.level", level) \
+        .execute()
+
+    subcategory_stats = {}
+
+    for result in task_results_res.data or []:
+        task_info = result.get("tasks", {})
+        main_category = task_info.get("main_category", "Nieznana kategoria")
+        sub_category = task_info.get("sub_category", "Nieznana podkategoria")
+
+        points = result.get("task_points", 0)
+        errors = result.get("task_error", 0)
+        uncertainty = result.get("task_uncertainty", 0)
+        difficulty = result.get("difficulty", 3)
+
+        total_possible = points + errors + uncertainty
+
+        sub_key = f"{main_category}#{sub_category}"
+
+        if sub_key not in subcategory_stats:
+            subcategory_stats[sub_key] = {
+                "main_category": main_category,
+                "sub_category": sub_category,
+                "total_points": 0,
+                "total_possible": 0,
+                "total_errors": 0,
+                "total_uncertainty": 0,
+                "total_difficulty": 0,
+                "total_tasks": 0
+            }
+
+        subcategory_stats[sub_key]["total_points"] += points
+        subcategory_stats[sub_key]["total_possible"] += total_possible
+        subcategory_stats[sub_key]["total_errors"] += errors
+        subcategory_stats[sub_key]["total_uncertainty"] += uncertainty
+        subcategory_stats[sub_key]["total_difficulty"] += difficulty
+        subcategory_stats[sub_key]["total_tasks"] += 1
+
+    return list(subcategory_stats.values())
+
+
 @analytics_bp.route('/get_class_performance_analysis/<class_id>/<level>', methods=['GET'])
 def get_class_performance_analysis(class_id, level):
     auth_header = request.headers.get('Authorization')
@@ -277,40 +462,32 @@ def get_class_performance_analysis(class_id, level):
         return jsonify({"error": error_message}), status_code
 
     try:
-        class_users_res = supabase \
-            .from_("user_classes") \
-            .select("user_id") \
-            .eq("class_id", class_id) \
-            .execute()
+        results = run_queries(
+            class_users_res=supabase
+                .from_("user_classes")
+                .select("user_id")
+                .eq("class_id", class_id),
+            class_info=lambda: _get_class_info(class_id),
+            subcategory_stats=lambda: call_rpc(
+                "class_performance_by_subcategory",
+                {"p_class_id": class_id, "p_level": level}
+            )
+        )
 
-        user_ids = [cu["user_id"] for cu in (class_users_res.data or [])]
+        user_ids = [cu["user_id"] for cu in (results["class_users_res"].data or [])]
 
         if not user_ids:
             return jsonify({"error": "Brak uczniów w klasie lub klasa nie istnieje"}), 404
 
         print(f"Znaleziono {len(user_ids)} uczniów w klasie {class_id} dla poziomu {level}")
 
-        task_results_res = supabase \
-            .from_("task_results") \
-            .select("""
-                task_points, 
-                task_error, 
-                task_uncertainty,
-                difficulty,
-                user_id,
-                tasks!inner (
-                    main_category,
-                    sub_category,
-                    level
-                )
-            """) \
-            .in_("user_id", user_ids) \
-            .eq("tasks.level", level) \
-            .execute()
+        subcategory_stats = results["subcategory_stats"]
+        if subcategory_stats is None:
+            subcategory_stats = _aggregate_subcategory_stats(user_ids, level)
 
-        task_results = task_results_res.data or []
+        total_results = sum(stats["total_tasks"] for stats in subcategory_stats)
 
-        if not task_results:
+        if not total_results:
             return jsonify({
                 "error": f"Brak wyników testów dla poziomu {level} w tej klasie",
                 "class_id": class_id,
@@ -318,56 +495,13 @@ def get_class_performance_analysis(class_id, level):
                 "subcategories": []
             }), 404
 
-
-        class_res = supabase \
-            .from_("classes") \
-            .select("id, name") \
-            .eq("id", class_id) \
-            .single() \
-            .execute()
-
-        class_info = class_res.data
+        class_info = results["class_info"]
         if not class_info:
             return jsonify({"error": "Nie znaleziono klasy"}), 404
 
-        subcategory_stats = {}
-
-        for result in task_results:
-            task_info = result.get("tasks", {})
-            main_category = task_info.get("main_category", "Nieznana kategoria")
-            sub_category = task_info.get("sub_category", "Nieznana podkategoria")
-
-            points = result.get("task_points", 0)
-            errors = result.get("task_error", 0)
-            uncertainty = result.get("task_uncertainty", 0)
-            difficulty = result.get("difficulty", 3)
-
-            total_possible = points + errors + uncertainty
-
-            sub_key = f"{main_category}#{sub_category}"
-
-            if sub_key not in subcategory_stats:
-                subcategory_stats[sub_key] = {
-                    "main_category": main_category,
-                    "sub_category": sub_category,
-                    "total_points": 0,
-                    "total_possible": 0,
-                    "total_errors": 0,
-                    "total_uncertainty": 0,
-                    "total_difficulty": 0,
-                    "total_tasks": 0
-                }
-
-            subcategory_stats[sub_key]["total_points"] += points
-            subcategory_stats[sub_key]["total_possible"] += total_possible
-            subcategory_stats[sub_key]["total_errors"] += errors
-            subcategory_stats[sub_key]["total_uncertainty"] += uncertainty
-            subcategory_stats[sub_key]["total_difficulty"] += difficulty
-            subcategory_stats[sub_key]["total_tasks"] += 1
-
         subcategories_analysis = []
 
-        for sub_key, stats in subcategory_stats.items():
+        for stats in subcategory_stats:
             score_percentage = (stats["total_points"] / stats["total_possible"] * 100) if stats[
                                                                                               "total_possible"] > 0 else 0
             error_rate = (stats["total_errors"] / stats["total_possible"] * 100) if stats["total_possible"] > 0 else 0
@@ -392,7 +526,7 @@ def get_class_performance_analysis(class_id, level):
                 "class_name": class_info["name"],
                 "level": level,
                 "total_students": len(user_ids),
-                "total_results_analyzed": len(task_results)
+                "total_results_analyzed": total_results
             },
             "subcategories": subcategories_analysis
         }), 200
@@ -402,6 +536,153 @@ def get_class_performance_analysis(class_id, level):
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
+TASK_RESULTS_COLUMNS = """
+    task_id,
+    user_id,
+    task_points,
+    task_error,
+    task_uncertainty,
+    time_spent,
+    difficulty,
+    completion_date,
+    users!inner (
+        name
+    ),
+    tasks!inner (
+        question,
+        task_type,
+        level,
+        main_category,
+        sub_category
+    )
+"""
+
+# PostgREST obcina odpowiedź do max-rows (domyślnie 1000) - większa strona zakończyłaby strumień za wcześnie
+POSTGREST_MAX_ROWS = int(os.getenv("POSTGREST_MAX_ROWS", 1000))
+TASK_ANALYTICS_PAGE_SIZE = min(int(os.getenv("TASK_ANALYTICS_PAGE_SIZE", 1000)), POSTGREST_MAX_ROWS)
+
+
+def _new_task_entry(task_id, task_info):
+    return {
+        "task_id": task_id,
+        "question": task_info.get("question", ""),
+        "main_category": task_info.get("main_category", ""),
+        "sub_category": task_info.get("sub_category", "") or "",
+        "task_type": task_info.get("task_type", ""),
+        "level": task_info.get("level", ""),
+        "students_count": 0,
+        "task_points": 0,
+        "task_error": 0,
+        "task_uncertainty": 0,
+        "time_spent": 0,
+        "difficulty": 0,
+        "difficulty_count": 0,
+        "student_results": []
+    }
+
+
+def _add_task_result(task_data, result):
+    user_info = result.get("users", {})
+
+    task_data["student_results"].append({
+        "user_id": result.get("user_id"),
+        "student_name": user_info.get("name", "Nieznany"),
+        "task_points": result.get("task_points", 0),
+        "task_error": result.get("task_error", 0),
+        "task_uncertainty": result.get("task_uncertainty", 0),
+        "time_spent": result.get("time_spent", 0),
+        "difficulty": result.get("difficulty"),
+        "completion_date": result.get("completion_date")
+    })
+
+    task_data["task_points"] += result.get("task_points", 0)
+    task_data["task_error"] += result.get("task_error", 0)
+    task_data["task_uncertainty"] += result.get("task_uncertainty", 0)
+    task_data["time_spent"] += result.get("time_spent", 0)
+
+    if result.get("difficulty") is not None:
+        task_data["difficulty"] += result.get("difficulty", 0)
+        task_data["difficulty_count"] += 1
+
+
+def _finalize_task_entry(task_data, summary_only=False):
+    task_data["students_count"] = len({sr["user_id"] for sr in task_data["student_results"]})
+
+    if task_data["difficulty_count"] > 0:
+        task_data["difficulty"] = round(task_data["difficulty"] / task_data["difficulty_count"], 1)
+    else:
+        task_data["difficulty"] = 3.0
+
+    del task_data["difficulty_count"]
+
+    if summary_only:
+        del task_data["student_results"]
+    else:
+        task_data["student_results"].sort(key=lambda x: x["student_name"])
+
+    return task_data
+
+
+def _fetch_task_results_page(class_id, after=None):
+    """Strona wyników klasy po kluczu (task_id, id) - następna strona zaczyna się za ostatnim wierszem
+    poprzedniej, więc koszt nie rośnie z numerem strony jak przy offset."""
+    query = supabase \
+        .from_("task_results") \
+        .select("id, " + TASK_RESULTS_COLUMNS) \
+        .eq("class_id", class_id)
+
+    if after is not None:
+        task_id, result_id = after
+        query = query.or_(f"task_id.gt.{task_id},and(task_id.eq.{task_id},id.gt.{result_id})")
+
+    return query \
+        .order("task_id") \
+        .order("id") \
+        .limit(TASK_ANALYTICS_PAGE_SIZE) \
+        .execute() \
+        .data or []
+
+
+def _stream_task_analytics(class_id, first_page):
+    """Generator tablicy JSON z zadaniami - wyniki są pobierane stronami po task_id,
+    więc w pamięci jest naraz tylko jedna strona i jedno zadanie.
+
+    W odróżnieniu od odpowiedzi buforowanej zadania są uporządkowane po task_id,
+    a nie po (main_category, level, question) - sortowanie wymagałoby zebrania całości.
+    """
+    dumps = current_app.json.dumps
+
+    yield '{"class_id": ' + dumps(class_id) + ', "tasks": ['
+
+    total_tasks = 0
+    task_data = None
+    page = first_page
+
+    while page:
+        for result in page:
+            if task_data is not None and task_data["task_id"] != result.get("task_id"):
+                yield ("," if total_tasks else "") + dumps(_finalize_task_entry(task_data))
+                total_tasks += 1
+                task_data = None
+
+            if task_data is None:
+                task_data = _new_task_entry(result.get("task_id"), result.get("tasks", {}))
+
+            _add_task_result(task_data, result)
+
+        if len(page) < TASK_ANALYTICS_PAGE_SIZE:
+            break
+
+        last = page[-1]
+        page = _fetch_task_results_page(class_id, (last["task_id"], last["id"]))
+
+    if task_data is not None:
+        yield ("," if total_tasks else "") + dumps(_finalize_task_entry(task_data))
+        total_tasks += 1
+
+    yield '], "total_tasks": ' + str(total_tasks) + '}'
+
+
 @analytics_bp.route('/get_task_analytics/<class_id>', methods=['GET'])
 def get_task_analytics(class_id):
     auth_header = request.headers.get('Authorization')
@@ -410,29 +691,33 @@ def get_task_analytics(class_id):
     if not payload:
         return jsonify({"error": error_message}), status_code
 
+    summary_only = request.args.get("details", "true").lower() == "false"
+    stream = request.args.get("stream", "false").lower() == "true"
+
     try:
+        if summary_only:
+            tasks_summary = call_rpc("class_task_summary", {"p_class_id": class_id})
+
+            if tasks_summary is not None:
+                return jsonify({
+                    "class_id": class_id,
+                    "total_tasks": len(tasks_summary),
+                    "tasks": tasks_summary
+                }), 200
+
+        elif stream:
+            # Pierwsza strona przed startem odpowiedzi, żeby błędy bazy wróciły jako 500.
+            # Zadania w strumieniu są uporządkowane po task_id (patrz _stream_task_analytics).
+            first_page = _fetch_task_results_page(class_id)
+
+            return Response(
+                stream_with_context(_stream_task_analytics(class_id, first_page)),
+                mimetype="application/json"
+            )
+
         task_results_res = supabase \
             .from_("task_results") \
-            .select("""
-                task_id,
-                user_id,
-                task_points,
-                task_error,
-                task_uncertainty,
-                time_spent,
-                difficulty,
-                completion_date,
-                users!inner (
-                    name
-                ),
-                tasks!inner (
-                    question,
-                    task_type,
-                    level,
-                    main_category,
-                    sub_category
-                )
-            """) \
+            .select(TASK_RESULTS_COLUMNS) \
             .eq("class_id", class_id) \
             .execute()
 
@@ -449,64 +734,13 @@ def get_task_analytics(class_id):
 
         for result in task_results:
             task_id = result.get("task_id")
-            user_info = result.get("users", {})
-            task_info = result.get("tasks", {})
 
             if task_id not in tasks_dict:
-                tasks_dict[task_id] = {
-                    "task_id": task_id,
-                    "question": task_info.get("question", ""),
-                    "main_category": task_info.get("main_category", ""),
-                    "sub_category": task_info.get("sub_category", "") or "",
-                    "task_type": task_info.get("task_type", ""),
-                    "level": task_info.get("level", ""),
-                    "students_count": 0,
-                    "task_points": 0,
-                    "task_error": 0,
-                    "task_uncertainty": 0,
-                    "time_spent": 0,
-                    "difficulty": 0,
-                    "difficulty_count": 0,
-                    "student_results": []
-                }
-
-            student_result = {
-                "user_id": result.get("user_id"),
-                "student_name": user_info.get("name", "Nieznany"),
-                "task_points": result.get("task_points", 0),
-                "task_error": result.get("task_error", 0),
-                "task_uncertainty": result.get("task_uncertainty", 0),
-                "time_spent": result.get("time_spent", 0),
-                "difficulty": result.get("difficulty"),
-                "completion_date": result.get("completion_date")
-            }
-
-            tasks_dict[task_id]["student_results"].append(student_result)
-
-            task_data = tasks_dict[task_id]
-            task_data["task_points"] += result.get("task_points", 0)
-            task_data["task_error"] += result.get("task_error", 0)
-            task_data["task_uncertainty"] += result.get("task_uncertainty", 0)
-            task_data["time_spent"] += result.get("time_spent", 0)
-
-            if result.get("difficulty") is not None:
-                task_data["difficulty"] += result.get("difficulty", 0)
-                task_data["difficulty_count"] += 1
-
-        tasks_list = []
-        for task_data in tasks_dict.values():
-            task_data["students_count"] = len({sr["user_id"] for sr in task_data["student_results"]})
+                tasks_dict[task_id] = _new_task_entry(task_id, result.get("tasks", {}))
 
-            if task_data["difficulty_count"] > 0:
-                task_data["difficulty"] = round(task_data["difficulty"] / task_data["difficulty_count"], 1)
-            else:
-                task_data["difficulty"] = 3.0
+            _add_task_result(tasks_dict[task_id], result)
 
-            del task_data["difficulty_count"]
-
-            task_data["student_results"].sort(key=lambda x: x["student_name"])
-
-            tasks_list.append(task_data)
+        tasks_list = [_finalize_task_entry(task_data, summary_only) for task_data in tasks_dict.values()]
 
         tasks_list.sort(key=lambda x: (x["main_category"], x["level"], x["question"]))
 
@@ -523,6 +757,110 @@ def get_task_analytics(class_id):
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
+TASK_ITEM_STATS_COLUMNS = ("total_answers", "correct", "incorrect", "uncertain")
+
+
+def _keyset_filter(keys, after):
+    """Warunek or_ dla wierszy za kluczem after, np. `a.gt.1,and(a.eq.1,b.gt.2)`."""
+    conditions = []
+    for i, key in enumerate(keys):
+        parts = [f"{keys[j]}.eq.{after[j]}" for j in range(i)] + [f"{key}.gt.{after[i]}"]
+        conditions.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return ",".join(conditions)
+
+
+def _fetch_all_pages(build_query, keys):
+    """Wszystkie wiersze zapytania stronami po POSTGREST_MAX_ROWS, po unikalnym kluczu keys."""
+    rows = []
+    after = None
+
+    while True:
+        query = build_query()
+        if after is not None:
+            query = query.or_(_keyset_filter(keys, after))
+        for key in keys:
+            query = query.order(key)
+
+        page = query.limit(POSTGREST_MAX_ROWS).execute().data or []
+        rows.extend(page)
+
+        if len(page) < POSTGREST_MAX_ROWS:
+            return rows
+
+        after = [page[-1][key] for key in keys]
+
+
+def _task_items_stats_fallback(class_id, task_ids):
+    """Te same statystyki co class_task_item_stats, liczone w Pythonie (bez migracji 006)."""
+    results = run_queries(
+        # Jeden wiersz na zadanie z wynikami w klasie - zamiast wszystkich task_results
+        tasks_res=supabase
+            .from_("tasks")
+            .select("id, task_results!inner(id)")
+            .in_("id", task_ids)
+            .eq("task_results.class_id", class_id)
+            .limit(1, foreign_table="task_results"),
+        task_items=lambda: _fetch_all_pages(
+            lambda: supabase.from_("task_items").select("*").in_("task_id", task_ids),
+            ("id",)
+        ),
+        answer_items=lambda: _fetch_all_pages(
+            lambda: supabase
+                .from_("answer_items")
+                .select("task_result_id, item_id, point, error, uncertain, task_results!inner(task_id, class_id)")
+                .eq("task_results.class_id", class_id)
+                .in_("task_results.task_id", task_ids),
+            ("task_result_id", "item_id")
+        )
+    )
+
+    tasks_with_results = {str(task["id"]) for task in results["tasks_res"].data or []}
+
+    answers_by_item = {}
+    for answer in results["answer_items"]:
+        stats = answers_by_item.setdefault(answer["item_id"], dict.fromkeys(TASK_ITEM_STATS_COLUMNS, 0))
+        stats["total_answers"] += 1
+        stats["correct"] += answer["point"]
+        stats["incorrect"] += answer["error"]
+        stats["uncertain"] += answer["uncertain"]
+
+    rows = []
+    for item in results["task_items"]:
+        if str(item["task_id"]) not in tasks_with_results:
+            continue
+
+        rows.append({
+            "task_id": item["task_id"],
+            "item_id": item["id"],
+            "template": item["template"],
+            "bonus_information": item["bonus_information"],
+            "correct_answer": item["correct_answer"],
+            **answers_by_item.get(item["id"], dict.fromkeys(TASK_ITEM_STATS_COLUMNS, 0))
+        })
+
+    return rows
+
+
+def _task_items_stats(class_id, task_ids):
+    """Statystyki odpowiedzi dla pozycji wielu zadań - agregacja w SQL, stałą liczbą zapytań."""
+    rows = call_rpc(
+        "class_task_item_stats",
+        {"p_class_id": class_id, "p_task_ids": [str(task_id) for task_id in task_ids]},
+        page_size=POSTGREST_MAX_ROWS,
+        order=("task_id", "item_id")
+    )
+    if rows is None:
+        rows = _task_items_stats_fallback(class_id, task_ids)
+
+    items_by_task = {str(task_id): [] for task_id in task_ids}
+    for row in rows:
+        task_id = str(row.pop("task_id"))
+        if task_id in items_by_task:
+            items_by_task[task_id].append(row)
+
+    return items_by_task
+
+
 @analytics_bp.route('/get_task_item_analytics/<class_id>/<task_id>', methods=['GET'])
 def get_task_item_analytics(task_id, class_id):
     auth_header = request.headers.get('Authorization')
@@ -531,64 +869,39 @@ def get_task_item_analytics(task_id, class_id):
         return jsonify({"error": error_message}), status_code
 
     try:
-        task_results_res = supabase \
-            .from_("task_results") \
-            .select("id,user_id") \
-            .eq("task_id", task_id) \
-            .eq("class_id", class_id) \
-            .execute()
-
-        task_results = task_results_res.data or []
-        if not task_results:
-            return jsonify({
-                "task_id": task_id,
-                "class_id": class_id,
-                "items": []
-            }), 200
-
-        task_result_ids = [tr["id"] for tr in task_results]
+        items_by_task = _task_items_stats(class_id, [task_id])
 
-        task_items_res = supabase \
-            .from_("task_items") \
-            .select("*") \
-            .eq("task_id", task_id) \
-            .execute()
+        return jsonify({
+            "task_id": task_id,
+            "class_id": class_id,
+            "items": items_by_task[str(task_id)]
+        }), 200
 
-        task_items = task_items_res.data or []
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        answer_items_res = supabase \
-            .from_("answer_items") \
-            .select("*") \
-            .in_("task_result_id", task_result_ids) \
-            .execute()
 
-        answer_items = answer_items_res.data or []
-
-        items_stats = []
-        for item in task_items:
-            item_id = item["id"]
-            answers_for_item = [a for a in answer_items if a["item_id"] == item_id]
-
-            stats = {
-                "item_id": item_id,
-                "template": item["template"],
-                "bonus_information": item["bonus_information"],
-                "correct_answer": item["correct_answer"],
-                "total_answers": len(answers_for_item),
-                "correct": sum(a["point"] for a in answers_for_item),
-                "incorrect": sum(a["error"] for a in answers_for_item),
-                "uncertain": sum(a["uncertain"] for a in answers_for_item)
-            }
-            items_stats.append(stats)
+@analytics_bp.route('/get_task_items_analytics/<class_id>', methods=['GET'])
+def get_task_items_analytics(class_id):
+    auth_header = request.headers.get('Authorization')
+    payload, error_message, status_code = decode_jwt_token(auth_header)
+    if not payload:
+        return jsonify({"error": error_message}), status_code
 
+    task_ids = [task_id for task_id in request.args.get("task_ids", "").split(",") if task_id]
 
+    if not task_ids:
+        return jsonify({"error": "Brak parametru task_ids"}), 400
 
+    try:
+        items_by_task = _task_items_stats(class_id, task_ids)
 
-        print(items_stats)
         return jsonify({
-            "task_id": task_id,
             "class_id": class_id,
-            "items": items_stats
+            "tasks": [
+                {"task_id": task_id, "items": items_by_task[str(task_id)]}
+                for task_id in task_ids
+            ]
         }), 200
 
     except Exception as e:
@@ -6,13 +6,14 @@ import secrets
 import string
 from werkzeug.security import generate_password_hash
 
-import bcrypt
 from flask import Blueprint, request, jsonify, render_template
 
-from app.services.exceptions import EmailAlreadyTakenError
+from app.services.exceptions import EmailAlreadyTakenError, PasswordServiceBusyError
 from app.services.supabase_client import supabase
 from postgrest.exceptions import APIError
 from app.services.mail_service import send_activation_email, send_password_reset_email
+from app.services.password_service import hash_password, check_password
+from app.services.compression import no_compression
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -46,7 +47,7 @@ def register():
                     return jsonify({"error": "username taken"}), 409
 
 
-        password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        password_hash = hash_password(password)
 
 
         new_user = supabase.table("users").insert({
@@ -75,6 +76,8 @@ def register():
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
+    except PasswordServiceBusyError:
+        raise
     except Exception as e:
         print(e)
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
@@ -95,7 +98,7 @@ def login():
     except APIError as e:
         return jsonify({"error": "User not found"}), 404
 
-    if not bcrypt.checkpw(password.encode('utf-8'), user["password_hash"].encode('utf-8')):
+    if not check_password(password, user["password_hash"]):
         return jsonify({"error": "Invalid password"}), 401
 
 
@@ -186,6 +189,7 @@ def send_reset_mail():
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
 @auth_bp.route('/reset-password/<user_id>', methods=['GET'])
+@no_compression  # strona zawiera nowe hasło - bez kompresji (BREACH)
 def reset_password(user_id):
     try:
         user_resp = (
@@ -204,7 +208,7 @@ def reset_password(user_id):
             return ''.join(secrets.choice(characters) for _ in range(length))
 
         new_password = generate_secure_password()
-        hashed_password  = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        hashed_password = hash_password(new_password)
 
         response = (
             supabase.table("users")
@@ -225,6 +229,8 @@ def reset_password(user_id):
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
+    except PasswordServiceBusyError:
+        raise
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
@@ -3,14 +3,48 @@ import jwt
 import datetime
 import os
 
-import bcrypt
 from flask import Blueprint, request, jsonify
 from app.services.supabase_client import supabase
 from postgrest.exceptions import APIError
+from ..services.exceptions import PasswordServiceBusyError
 from ..services.jwt_check import decode_jwt_token
+from ..services.password_service import hash_password, check_password
+from ..services.query_cache import query_cache
+from ..services.query_executor import run_queries
 
 classes_bp = Blueprint('classes', __name__)
 
+CLASS_LIST_COLUMNS = "id, name, image_url, owner_id, created_at"
+
+
+def _get_class_row(class_id):
+    return query_cache.get_or_load(
+        "classes", {"id": class_id},
+        lambda: supabase.table("classes").select("*").eq("id", class_id).single().execute().data
+    )
+
+
+def _get_member_class_ids(user_id):
+    """Id klas, do których należy użytkownik (cache'owane do zmiany członkostwa)."""
+    return query_cache.get_or_load(
+        "user_classes", {"user_id": user_id},
+        lambda: [
+            row["class_id"]
+            for row in supabase.table("user_classes").select("class_id").eq("user_id", user_id).execute().data or []
+        ]
+    )
+
+
+def _class_with_flag(cls, owned_by_user):
+    return {
+        "id": cls["id"],
+        "name": cls["name"],
+        "image_url": cls["image_url"],
+        "owner_id": cls["owner_id"],
+        "created_at": cls["created_at"],
+        "owned_by_user": owned_by_user
+    }
+
 
 @classes_bp.route('/teacher_classes', methods=['GET'])
 def get_teacher_classes():
@@ -69,6 +103,8 @@ def delete_teacher_class(class_id):
             .eq("owner_id", owner_id) \
             .execute()
 
+        query_cache.invalidate("classes", id=class_id)
+
         return jsonify({"message": "Klasa została pomyślnie usunięta"}), 200
 
     except APIError as e:
@@ -91,7 +127,7 @@ def create_class():
 
     password_hash = None
     if password:
-        password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        password_hash = hash_password(password)
 
     try:
         supabase.table("classes").insert({
@@ -118,32 +154,20 @@ def get_student_classes():
         return jsonify({"error": error_message}), status_code
 
     try:
-        response = supabase \
-            .from_("classes") \
-            .select("""
-                id,
-                name,
-                image_url,
-                owner_id,
-                created_at,
-                user_classes(user_id)
-            """) \
-            .execute()
-
         user_id = payload["sub"]
-        classes_raw = response.data
-
-        classes_with_flag = []
-        for cls in classes_raw:
-            owned_by_user = any(uc["user_id"] == user_id for uc in cls.get("user_classes", []))
-            classes_with_flag.append({
-                "id": cls["id"],
-                "name": cls["name"],
-                "image_url": cls["image_url"],
-                "owner_id": cls["owner_id"],
-                "created_at": cls["created_at"],
-                "owned_by_user": owned_by_user
-            })
+
+        results = run_queries(
+            classes_res=supabase
+                .from_("classes")
+                .select(CLASS_LIST_COLUMNS),
+            member_class_ids=lambda: _get_member_class_ids(user_id)
+        )
+
+        member_class_ids = set(results["member_class_ids"])
+        classes_with_flag = [
+            _class_with_flag(cls, cls["id"] in member_class_ids)
+            for cls in results["classes_res"].data or []
+        ]
 
         return jsonify(classes_with_flag)
 
@@ -167,8 +191,7 @@ def join_class():
     join_password = data.get("joinPassword")
 
     try:
-        response = supabase.table("classes").select("*").eq("id", class_id).single().execute()
-        class_data = response.data
+        class_data = _get_class_row(class_id)
 
         if not class_data:
             return jsonify({"error": "Nie znaleziono klasy"}), 404
@@ -177,7 +200,7 @@ def join_class():
         if db_password:
             if not join_password:
                 return jsonify({"error": "Hasło jest wymagane"}), 400
-            if not bcrypt.checkpw(join_password.encode("utf-8"), db_password.encode("utf-8")):
+            if not check_password(join_password, db_password):
                 return jsonify({"error": "Nieprawidłowe hasło"}), 422
 
         supabase.table("user_classes").insert({
@@ -185,32 +208,12 @@ def join_class():
             "class_id": class_id,
         }).execute()
 
-        result = supabase \
-            .from_("classes") \
-            .select("""
-                id,
-                name,
-                image_url,
-                owner_id,
-                created_at,
-                user_classes(user_id)
-            """) \
-            .execute()
-
-        classes_with_flag = []
-        for cls in result.data:
-            owned_by_user = any(uc["user_id"] == user_id for uc in cls.get("user_classes", []))
-            classes_with_flag.append({
-                "id": cls["id"],
-                "name": cls["name"],
-                "image_url": cls["image_url"],
-                "owner_id": cls["owner_id"],
-                "created_at": cls["created_at"],
-                "owned_by_user": owned_by_user
-            })
+        query_cache.invalidate("user_classes", user_id=user_id)
 
-        return jsonify(classes_with_flag)
+        return jsonify(_class_with_flag(class_data, True))
 
+    except PasswordServiceBusyError:
+        raise
     except Exception as e:
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
@@ -236,31 +239,14 @@ def leave_class(class_id):
             .eq("class_id", class_id) \
             .execute()
 
-        result = supabase \
-            .from_("classes") \
-            .select("""
-                id,
-                name,
-                image_url,
-                owner_id,
-                created_at,
-                user_classes(user_id)
-            """) \
-            .execute()
+        query_cache.invalidate("user_classes", user_id=user_id)
 
-        classes_with_flag = []
-        for cls in result.data:
-            owned_by_user = any(uc["user_id"] == user_id for uc in cls.get("user_classes", []))
-            classes_with_flag.append({
-                "id": cls["id"],
-                "name": cls["name"],
-                "image_url": cls["image_url"],
-                "owner_id": cls["owner_id"],
-                "created_at": cls["created_at"],
-                "owned_by_user": owned_by_user
-            })
+        class_data = _get_class_row(class_id)
 
-        return jsonify(classes_with_flag)
+        if not class_data:
+            return jsonify({"error": "Nie znaleziono klasy"}), 404
+
+        return jsonify(_class_with_flag(class_data, False))
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
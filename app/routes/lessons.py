@@ -2,9 +2,27 @@ from flask import Blueprint, request, jsonify
 from app.services.supabase_client import supabase
 from postgrest.exceptions import APIError
 from ..services.jwt_check import decode_jwt_token
+from ..services.query_cache import query_cache
+from ..services.etag import version_etag, row_etag, not_modified, with_etag
+from ..services.schema_fallback import MISSING_COLUMN_CODES, with_schema_fallback
+from ..services.helpers.pagination import apply_list_params, is_paginated, set_pagination_headers, \
+    wants_total_count
 
 lessons_bp = Blueprint('lessons_bp', __name__)
 
+LESSON_LIST_COLUMNS = "id, title, description, owner_id, main_category, sub_category, level"
+
+
+def _write_lesson(write, lesson_data):
+    """Zapisuje lekcję razem z char_count; bez migracji 003 zapisuje ją bez tej kolumny."""
+    return with_schema_fallback(
+        "kolumny lessons.char_count", MISSING_COLUMN_CODES,
+        lambda: write(lesson_data),
+        lambda: write({key: value for key, value in lesson_data.items() if key != "char_count"}),
+        "zapisuję lekcje bez niej"
+    )
+
+
 @lessons_bp.route('/lessons', methods=['GET'])
 def get_teacher_lessons():
     auth_header = request.headers.get('Authorization')
@@ -16,15 +34,23 @@ def get_teacher_lessons():
     user_id = payload["sub"]
 
     try:
-        lessons_response = supabase \
+        paginated = is_paginated(request.args)
+
+        # Na liście stronicowanej bez treści lekcji - pełna lekcja z /lesson/<id>
+        query = supabase \
             .from_("lessons") \
-            .select("*") \
-            .eq("owner_id", user_id) \
-            .execute()
+            .select(LESSON_LIST_COLUMNS if paginated else "*", count="exact" if wants_total_count(request.args) else None) \
+            .eq("owner_id", user_id)
+        query, limit = apply_list_params(query, request.args)
 
+        lessons_response = query.execute()
         lessons = lessons_response.data
 
-        return jsonify(lessons)
+        response = jsonify(lessons)
+        if paginated:
+            set_pagination_headers(response, lessons, lessons_response.count, limit)
+
+        return response
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
@@ -49,16 +75,17 @@ def create_lesson():
             "title": data["title"],
             "description": data.get("description", ""),
             "context": data.get("context", ""),
+            "char_count": len(data.get("context", "")),
             "owner_id": owner_id,
             "main_category": data["main_category"],
             "sub_category": data["sub_category"],
             "level": data["level"],
         }
 
-        response = supabase \
-            .from_("lessons") \
-            .insert(lesson_data) \
-            .execute()
+        response = _write_lesson(
+            lambda row: supabase.from_("lessons").insert(row).execute(),
+            lesson_data
+        )
 
 
         return jsonify({
@@ -76,19 +103,19 @@ def create_lesson():
 def get_lesson(lesson_id):
 
     try:
-        response = supabase \
-            .from_("lessons") \
-            .select("*") \
-            .eq("id", lesson_id) \
-            .single() \
-            .execute()
+        cached = not_modified(version_etag("lessons", lesson_id))
+        if cached:
+            return cached
 
-        lesson = response.data
+        lesson = query_cache.get_or_load(
+            "lessons", {"id": lesson_id},
+            lambda: supabase.from_("lessons").select("*").eq("id", lesson_id).single().execute().data
+        )
 
         if lesson is None:
             return jsonify({"error": "Lekcja nie została znaleziona."}), 404
 
-        return jsonify(lesson), 200
+        return with_etag(jsonify(lesson), row_etag("lessons", lesson_id, lesson)), 200
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
@@ -125,6 +152,9 @@ def delete_teacher_lesson(lesson_id):
             .eq("owner_id", owner_id) \
             .execute()
 
+        query_cache.invalidate("lessons", id=lesson_id)
+        query_cache.invalidate("sections")
+
         return jsonify({"message": "Lekcja została usunięta pomyślnie."}), 200
 
     except APIError as e:
@@ -159,17 +189,19 @@ def update_lesson(lesson_id):
             "title": data["title"],
             "description": data.get("description", ""),
             "context": data.get("context", ""),
+            "char_count": len(data.get("context", "")),
             "main_category": data["main_category"],
             "sub_category": data["sub_category"],
             "level": data["level"],
         }
 
-        supabase \
-            .from_("lessons") \
-            .update(lesson_update) \
-            .eq("id", lesson_id) \
-            .eq("owner_id", owner_id) \
-            .execute()
+        _write_lesson(
+            lambda row: supabase.from_("lessons").update(row).eq("id", lesson_id).eq("owner_id", owner_id).execute(),
+            lesson_update
+        )
+
+        query_cache.invalidate("lessons", id=lesson_id)
+        query_cache.invalidate("sections")
 
         return jsonify({
             "message": "Lekcja została zaktualizowana."
@@ -8,35 +8,35 @@ from flask import Blueprint, request, jsonify
 from app.services.supabase_client import supabase
 from postgrest.exceptions import APIError
 from ..services.jwt_check import decode_jwt_token
+from ..services.placement_test_cache import PLACEMENT_TEST_OWNER_ID, PLACEMENT_TEST_COLUMNS, get_placement_test
+from ..services.helpers.answers import build_answer_items
+from ..services.helpers.timing import PhaseTimer
 
 placement_test_bp = Blueprint('placement_test', __name__)
 
+SUBMIT_TEST_BUDGET_MS = float(os.getenv("SUBMIT_TEST_BUDGET_MS", 1500))
+
 @placement_test_bp.route('/get_test/<level>', methods=['GET'])
 def get_test(level):
     if not level:
         return jsonify({"error": "Missing level id"}), 400
 
-    try:
-        tasks_response = supabase \
+    def load():
+        tasks = supabase \
             .from_("tasks") \
-            .select("*") \
+            .select(PLACEMENT_TEST_COLUMNS) \
             .eq("level", level) \
-            .eq("owner_id", "aa9792f9-6bc2-4078-aa1d-2364f68b41db")\
-            .execute()
-
-
-        tasks = tasks_response.data
+            .eq("owner_id", PLACEMENT_TEST_OWNER_ID) \
+            .execute() \
+            .data or []
 
         for task in tasks:
-            task_items_response = supabase \
-                .from_("task_items") \
-                .select("*") \
-                .eq("task_id", task["id"]) \
-                .execute()
+            task["task_items"] = task.get("task_items") or []
 
-            task["task_items"] = task_items_response.data if task_items_response.data else []
+        return tasks
 
-        return jsonify(tasks)
+    try:
+        return jsonify(get_placement_test(level, load))
 
 
     except APIError as e:
@@ -63,6 +63,34 @@ def submit_test():
     answers = answers_data.get("answers", [])
     level = answers_data.get("level", "A1")
 
+    timer = PhaseTimer()
+
+    # Walidacja całego zgłoszenia przed usunięciem starych wyników, żeby błędne
+    # dane nie skasowały poprzedniego testu ani nie zostawiły połowy nowego w bazie
+    try:
+        task_result_rows = [{
+            "user_id": user_id,
+            "task_id": answer["taskId"],
+            "task_points": answer["taskPoints"],
+            "task_error": answer["taskError"],
+            "task_uncertainty": answer["taskUncertainty"],
+            "difficulty": answer["difficulty"],
+            "time_spent": answer["timeSpent"],
+            "completion_date": answer["completionDate"]
+        } for answer in answers]
+
+        answer_rows_per_task = []
+        for answer in answers:
+            rows, failed_items = build_answer_items(None, answer.get("scoredAnswers", []))
+            if failed_items:
+                return jsonify({"error": f"Invalid answers for task {answer['taskId']}", "failed_items": failed_items}), 400
+            answer_rows_per_task.append(rows)
+
+        analysis = generate_analysis(answers)
+    except (KeyError, TypeError, AttributeError) as e:
+        return jsonify({"error": f"Niepoprawne dane odpowiedzi: {e}"}), 400
+    timer.mark("validation")
+
     try:
         tasks_response = supabase.table("tasks").select("id").eq("level", level).execute()
         task_ids = [task["id"] for task in (tasks_response.data or [])]
@@ -73,38 +101,35 @@ def submit_test():
                 .eq("user_id", user_id) \
                 .in_("task_id", task_ids) \
                 .execute()
-
-        for i, answer in enumerate(answers):
-            result = supabase.table("task_results").insert({
-                "user_id": user_id,
-                "task_id": answer["taskId"],
-                "task_points": answer["taskPoints"],
-                "task_error": answer["taskError"],
-                "task_uncertainty": answer["taskUncertainty"],
-                "difficulty": answer["difficulty"],
-                "time_spent": answer["timeSpent"],
-                "completion_date": answer["completionDate"]
-            }).execute()
-
-            if not result.data:
-                raise Exception(f"Failed to insert task result for answer {i + 1}")
-
-            task_result_id = result.data[0]["id"]
-
-            # Zapisz sub-odpowiedzi
-            for sub in answer.get("scoredAnswers", []):
-                task_items_data = list(sub.values())[0]
-                supabase.table("answer_items").insert({
-                    "task_result_id": task_result_id,
-                    "item_id": list(sub.keys())[0],
-                    "point": task_items_data["point"],
-                    "error": task_items_data["error"],
-                    "uncertain": task_items_data["uncertain"],
-                    "my_answer": task_items_data["myAnswer"],
-                    "correct_answer": task_items_data["correctAnswer"]
-                }).execute()
-
-        analysis = generate_analysis(answers)
+        timer.mark("cleanup")
+
+        task_results = []
+        if task_result_rows:
+            result = supabase.table("task_results").insert(task_result_rows).execute()
+            task_results = result.data or []
+
+            if len(task_results) != len(task_result_rows):
+                raise Exception("Failed to insert task results")
+        timer.mark("task_results")
+
+        # PostgREST zwraca wiersze w kolejności inserta
+        answer_rows = []
+        for answer, task_result, rows in zip(answers, task_results, answer_rows_per_task):
+            if str(task_result["task_id"]) != str(answer["taskId"]):
+                raise Exception(f"Task result mismatch for task {answer['taskId']}")
+
+            for row in rows:
+                row["task_result_id"] = task_result["id"]
+            answer_rows.extend(rows)
+
+        if answer_rows:
+            supabase.table("answer_items").insert(answer_rows).execute()
+        timer.mark("answer_items")
+
+        timings = timer.summary()
+        print(f"submit_test: {len(answers)} zadań, {len(answer_rows)} odpowiedzi, czasy [ms]: {timings}")
+        if timings["total"] > SUBMIT_TEST_BUDGET_MS:
+            print(f"submit_test przekroczył budżet {SUBMIT_TEST_BUDGET_MS} ms")
 
         return jsonify({
             "status": "success",
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 
 from flask import Blueprint, request, jsonify
@@ -5,6 +6,8 @@ from postgrest.exceptions import APIError
 
 from app.services.supabase_client import supabase
 from ..services.jwt_check import decode_jwt_token
+from ..services.query_cache import query_cache
+from ..services.etag import make_etag, not_modified, with_etag
 
 sections_bp = Blueprint('sections', __name__)
 
@@ -30,6 +33,7 @@ def create_section():
         }).execute()
 
         new_section_id = section_insert_response.data[0]['id']
+        _invalidate_sections(data["class_id"])
 
         return jsonify({"message": "Sekcja utworzona pomyślnie", "section_id": new_section_id}), 201
 
@@ -40,6 +44,40 @@ def create_section():
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
 
+def _load_sections(class_id):
+    """Całe drzewo sekcji klasy (z lekcjami i zadaniami) jednym zapytaniem."""
+    sections = supabase \
+        .from_("sections") \
+        .select("*, section_lesson(lessons(*)), section_task(tasks(*))") \
+        .eq("class_id", class_id) \
+        .order("created_at", desc=False) \
+        .execute() \
+        .data or []
+
+    for section in sections:
+        section["lessons"] = [link["lessons"] for link in section.pop("section_lesson", None) or []]
+        section["tasks"] = [link["tasks"] for link in section.pop("section_task", None) or []]
+
+    return sections
+
+
+def _load_sections_entry(class_id):
+    sections = _load_sections(class_id)
+    return {"etag": make_etag(json.dumps(sections, sort_keys=True, default=str)), "sections": sections}
+
+
+def _get_sections(class_id):
+    """Drzewo sekcji razem ze skrótem jego treści - jeden wpis cache, więc ETag zawsze pasuje do drzewa."""
+    return query_cache.get_or_load("sections", {"class_id": class_id}, lambda: _load_sections_entry(class_id))
+
+
+def _invalidate_sections(class_id=None):
+    if class_id:
+        query_cache.invalidate("sections", class_id=class_id)
+    else:
+        query_cache.invalidate("sections")
+
+
 @sections_bp.route('/get_sections/<class_id>', methods=['GET'])
 def get_sections(class_id):
     auth_header = request.headers.get('Authorization')
@@ -49,40 +87,12 @@ def get_sections(class_id):
         return jsonify({"error": error_message}), status_code
 
     try:
-        sections_resp = supabase \
-            .from_("sections") \
-            .select("*") \
-            .eq("class_id", class_id) \
-            .order("created_at", desc=False) \
-            .execute()
-        sections = sections_resp.data
-
-        lessons_resp = supabase \
-            .from_("section_lesson") \
-            .select("*, lessons(*)") \
-            .eq("class_id", class_id) \
-            .execute()
-        lessons = lessons_resp.data
-
-        tasks_resp = supabase \
-            .from_("section_task") \
-            .select("*, tasks(*)") \
-            .eq("class_id", class_id) \
-            .execute()
-        tasks = tasks_resp.data
+        entry = _get_sections(class_id)
+        cached = not_modified(entry["etag"])
+        if cached:
+            return cached
 
-        for section in sections:
-            section["lessons"] = []
-            section["tasks"] = []
-            for lesson in lessons:
-                if lesson["section_id"] == section['id']:
-                    section["lessons"].append(lesson['lessons'])
-
-            for task in tasks:
-                if task["section_id"] == section['id']:
-                    section["tasks"].append(task["tasks"])
-
-        return jsonify(sections), 200
+        return with_etag(jsonify(entry["sections"]), entry["etag"]), 200
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
@@ -120,6 +130,7 @@ def add_lesson_to_section():
         }).execute()
 
         if response.data:
+            _invalidate_sections(class_id)
             return jsonify({"message": "Lekcja została dodana do sekcji"}), 201
         else:
             return jsonify({"error": "Nie udało się dodać lekcji"}), 500
@@ -163,6 +174,7 @@ def add_task_to_section():
         }).execute()
 
         if response.data:
+            _invalidate_sections(class_id)
             return jsonify({"message": "Zadanie zostało dodane do sekcji"}), 201
         else:
             return jsonify({"error": "Nie udało się dodać zadania"}), 500
@@ -196,6 +208,9 @@ def remove_task_from_section():
             .eq("task_id", task_id) \
             .execute()
 
+        for link in response.data or []:
+            _invalidate_sections(link.get("class_id"))
+
         return jsonify({"message": "Zadanie zostało usunięte z sekcji"}), 200
 
 
@@ -228,6 +243,9 @@ def remove_lesson_from_section():
             .eq("lesson_id", lesson_id) \
             .execute()
 
+        for link in response.data or []:
+            _invalidate_sections(link.get("class_id"))
+
         return jsonify({"message": "Lekcja została usunięta z sekcji"}), 200
 
 
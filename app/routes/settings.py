@@ -1,10 +1,12 @@
 import uuid
 
-import bcrypt
 from flask import Blueprint, request, jsonify
 from app.services.supabase_client import supabase
 from postgrest.exceptions import APIError
+from ..services.exceptions import PasswordServiceBusyError
 from ..services.jwt_check import decode_jwt_token
+from ..services.password_service import hash_password, check_password
+from ..services.query_cache import query_cache
 
 settings_bp = Blueprint('settings', __name__)
 
@@ -41,6 +43,8 @@ def update_username():
         if not response.data:
             return jsonify({"success": False, "error": "Nie znaleziono użytkownika"}), 404
 
+        query_cache.invalidate("users", id=user_id)
+
         return jsonify({"success": True, "message": "Nazwa użytkownika została zaktualizowana"}), 200
 
     except APIError as e:
@@ -74,10 +78,10 @@ def change_password():
         if not user_response.data:
             return jsonify({"success": False, "error": "Nie znaleziono użytkownika"}), 404
 
-        if not bcrypt.checkpw(old_password.encode('utf-8'), user_response.data['password_hash'].encode('utf-8')):
+        if not check_password(old_password, user_response.data['password_hash']):
             return jsonify({"success": False, "error": "Nieprawidłowe aktualne hasło"}), 400
 
-        new_password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        new_password_hash = hash_password(new_password)
 
         response = supabase \
             .from_("users") \
@@ -89,6 +93,8 @@ def change_password():
 
     except APIError as e:
         return jsonify({"success": False, "error": f"Supabase API error: {str(e)}"}), 500
+    except PasswordServiceBusyError:
+        raise
     except Exception as e:
         return jsonify({"success": False, "error": f"Unexpected error: {str(e)}"}), 500
 
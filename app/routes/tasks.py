@@ -4,10 +4,45 @@ from flask import Blueprint, request, jsonify
 from app.services.supabase_client import supabase
 from postgrest.exceptions import APIError
 from ..services.jwt_check import decode_jwt_token
+from ..services.helpers.answers import build_answer_items
+from ..services.helpers.pagination import apply_list_params, is_paginated, set_pagination_headers, \
+    wants_total_count
+from ..services.placement_test_cache import invalidate_placement_tests
+from ..services.query_cache import query_cache
+from ..services.etag import version_etag, row_etag, not_modified, with_etag
 
 tasks_bp = Blueprint('tasks', __name__)
 
 
+def _get_task_row(task_id):
+    return query_cache.get_or_load(
+        "tasks", {"id": task_id},
+        lambda: supabase.from_("tasks").select("*").eq("id", task_id).single().execute().data
+    )
+
+
+TASK_WITH_ITEMS_COLUMNS = "*, task_items(*)"
+
+
+def _get_task_with_items(task_id):
+    """Zadanie z task_items jednym zapytaniem i w jednym wpisie cache - updated_at zawsze pasuje do pozycji."""
+    def load():
+        rows = supabase.from_("tasks").select(TASK_WITH_ITEMS_COLUMNS).eq("id", task_id).limit(1).execute().data
+        if not rows:
+            return None
+
+        task = rows[0]
+        task["task_items"] = task.get("task_items") or []
+        return task
+
+    return query_cache.get_or_load("tasks", {"id": task_id}, load, columns=TASK_WITH_ITEMS_COLUMNS)
+
+
+def _invalidate_task(task_id):
+    query_cache.invalidate("tasks", id=task_id)
+    query_cache.invalidate("sections")
+
+
 @tasks_bp.route('/tasks', methods=['GET'])
 def get_teacher_tasks():
     auth_header = request.headers.get('Authorization')
@@ -19,16 +54,22 @@ def get_teacher_tasks():
     user_id = payload["sub"]
 
     try:
-        tasks_response = supabase \
+        paginated = is_paginated(request.args)
+
+        query = supabase \
             .from_("tasks") \
-            .select("*") \
-            .eq("owner_id", user_id) \
-            .execute()
+            .select("*", count="exact" if wants_total_count(request.args) else None) \
+            .eq("owner_id", user_id)
+        query, limit = apply_list_params(query, request.args)
 
+        tasks_response = query.execute()
         tasks = tasks_response.data
 
+        response = jsonify(tasks)
+        if paginated:
+            set_pagination_headers(response, tasks, tasks_response.count, limit)
 
-        return jsonify(tasks)
+        return response
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
@@ -79,6 +120,8 @@ def create_task():
 
             supabase.from_("task_items").insert(formatted_task_items).execute()
 
+        invalidate_placement_tests(user_id)
+
         return jsonify({"message": "Zadanie utworzone pomyślnie", "task_id": new_task_id}), 201
 
     except APIError as e:
@@ -97,29 +140,16 @@ def get_task(task_id):
         return jsonify({"error": error_message}), status_code
 
     try:
-        task_response = supabase \
-            .from_("tasks") \
-            .select("*") \
-            .eq("id", task_id) \
-            .single() \
-            .execute()
-
-        if task_response.data is None:
-            return jsonify({"error": "Zadanie nie istnieje."}), 404
+        cached = not_modified(version_etag("tasks", task_id, "task"))
+        if cached:
+            return cached
 
-        task = task_response.data
+        task = _get_task_with_items(task_id)
 
-        task_items_response = supabase \
-            .from_("task_items") \
-            .select("*") \
-            .eq("task_id", task_id) \
-            .execute()
-
-        task_items = task_items_response.data or []
-
-        task["task_items"] = task_items
+        if task is None:
+            return jsonify({"error": "Zadanie nie istnieje."}), 404
 
-        return jsonify(task)
+        return with_etag(jsonify(task), row_etag("tasks", task_id, task, "task"))
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
@@ -157,6 +187,9 @@ def delete_teacher_task(task_id):
             .eq("owner_id", owner_id) \
             .execute()
 
+        _invalidate_task(task_id)
+        invalidate_placement_tests(owner_id)
+
         return jsonify({"message": "Zadanie zostało pomyślnie usunięte"}), 200
 
     except APIError as e:
@@ -208,6 +241,9 @@ def update_task(task_id):
                     .insert(task_item_data) \
                     .execute()
 
+        _invalidate_task(task_id)
+        invalidate_placement_tests(user_id)
+
         return jsonify({"message": "Zadanie zaktualizowane pomyślnie"}), 200
 
     except APIError as e:
@@ -226,15 +262,14 @@ def get_task_items(task_id):
         return jsonify({"error": error_message}), status_code
 
     try:
-        task_items_response = supabase \
-            .from_("task_items") \
-            .select("*") \
-            .eq("task_id", task_id) \
-            .execute()
+        cached = not_modified(version_etag("tasks", task_id, "task_items"))
+        if cached:
+            return cached
 
-        task_items = task_items_response.data
+        task = _get_task_with_items(task_id)
+        task_items = task["task_items"] if task else []
 
-        return jsonify({"task_items": task_items})
+        return with_etag(jsonify({"task_items": task_items}), row_etag("tasks", task_id, task, "task_items"))
 
     except APIError as e:
         return jsonify({"error": f"Supabase API error: {str(e)}"}), 500
@@ -243,6 +278,28 @@ def get_task_items(task_id):
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
 
+def _insert_answer_items(answer_rows, failed_items):
+    """Zapisuje odpowiedzi jednym insertem; przy błędzie ustala, które pozycje zawiodły."""
+    if not answer_rows:
+        return 0
+
+    try:
+        supabase.table("answer_items").insert(answer_rows).execute()
+        return len(answer_rows)
+    except APIError as e:
+        print(f"Zbiorczy zapis odpowiedzi nie powiódł się, zapisuję pojedynczo: {str(e)}")
+
+    saved_items = 0
+    for row in answer_rows:
+        try:
+            supabase.table("answer_items").insert(row).execute()
+            saved_items += 1
+        except APIError as e:
+            failed_items.append({"item_id": row["item_id"], "error": str(e)})
+
+    return saved_items
+
+
 @tasks_bp.route('/submit_task', methods=['POST'])
 def submit_single_task():
     auth_header = request.headers.get('Authorization')
@@ -264,14 +321,9 @@ def submit_single_task():
 
         print(f"Otrzymano dane zadania: taskId={data['taskId']}, classId={data['classId']}")
 
-        task_response = supabase \
-            .from_("tasks") \
-            .select("*") \
-            .eq("id", data["taskId"]) \
-            .single() \
-            .execute()
+        task = _get_task_row(data["taskId"])
 
-        if not task_response.data:
+        if not task:
             return jsonify({"error": "Zadanie nie istnieje"}), 404
 
         existing_result = supabase \
@@ -311,20 +363,10 @@ def submit_single_task():
         task_result_id = result.data[0]["id"]
         print(f"Zapisano wynik zadania z ID: {task_result_id}")
 
-        if data["scoredAnswers"]:
-            for answer_obj in data["scoredAnswers"]:
-                for task_item_id, answer_data in answer_obj.items():
-                    supabase.table("answer_items").insert({
-                        "task_result_id": task_result_id,
-                        "item_id": task_item_id,
-                        "point": answer_data["point"],
-                        "error": answer_data["error"],
-                        "uncertain": answer_data["uncertain"],
-                        "my_answer": answer_data["myAnswer"],
-                        "correct_answer": answer_data["correctAnswer"]
-                    }).execute()
-
-        print(f"Zapisano {len(data['scoredAnswers'])} szczegółowych odpowiedzi")
+        answer_rows, failed_items = build_answer_items(task_result_id, data["scoredAnswers"])
+        saved_items = _insert_answer_items(answer_rows, failed_items)
+
+        print(f"Zapisano {saved_items} szczegółowych odpowiedzi, błędów: {len(failed_items)}")
 
         total_items = len(data["scoredAnswers"])
         percentage = round((data["taskPoints"] / total_items) * 100, 2) if total_items > 0 else 0
@@ -333,6 +375,8 @@ def submit_single_task():
             "status": "success",
             "message": "Wynik zadania został zapisany pomyślnie",
             "result_id": task_result_id,
+            "saved_items": saved_items,
+            "failed_items": failed_items,
             "score": {
                 "points": data["taskPoints"],
                 "errors": data["taskError"],
@@ -0,0 +1,135 @@
+import gzip
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+from flask import request, current_app
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", 6))
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+}
+
+ENCODINGS = ["gzip", "deflate"]
+
+
+def no_compression(view):
+    """Wyłącza kompresję odpowiedzi danego endpointu (dekorator pod @bp.route)."""
+    view.no_compression = True
+    return view
+
+
+def _compress(data, encoding, level):
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zlib.compress(data, level)
+
+
+class CompressionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_time = 0.0
+        self._endpoints = defaultdict(lambda: {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_time": 0.0})
+
+    def record(self, endpoint, bytes_in, bytes_out, cpu_time):
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_time += cpu_time
+
+            entry = self._endpoints[endpoint]
+            entry["responses"] += 1
+            entry["bytes_in"] += bytes_in
+            entry["bytes_out"] += bytes_out
+            entry["cpu_time"] += cpu_time
+
+    def record_skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "compressed": self.compressed,
+                "skipped": self.skipped,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0,
+                "cpu_ms": round(self.cpu_time * 1000, 2),
+                "endpoints": {
+                    endpoint: {
+                        "responses": entry["responses"],
+                        "ratio": round(entry["bytes_out"] / entry["bytes_in"], 4) if entry["bytes_in"] else 0,
+                        "avg_cpu_ms": round(entry["cpu_time"] / entry["responses"] * 1000, 3),
+                    }
+                    for endpoint, entry in self._endpoints.items()
+                },
+            }
+
+
+compression_stats = CompressionStats()
+
+
+def _should_compress(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+
+    # Odpowiedzi strumieniowane (np. get_task_analytics?stream=true) idą bez bufora
+    if response.is_streamed or response.direct_passthrough:
+        return False
+
+    if "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+
+    view = current_app.view_functions.get(request.endpoint)
+    return not getattr(view, "no_compression", False)
+
+
+def register_compression(app, min_size=COMPRESSION_MIN_SIZE, level=COMPRESSION_LEVEL):
+    """Kompresja gzip/deflate odpowiedzi większych niż min_size, zgodnie z Accept-Encoding."""
+    if not COMPRESSION_ENABLED:
+        return
+
+    @app.after_request
+    def compress_response(response):
+        if not _should_compress(response):
+            return response
+
+        response.vary.add("Accept-Encoding")
+
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        data = response.get_data()
+        if encoding is None or len(data) < min_size:
+            compression_stats.record_skip()
+            return response
+
+        started = time.thread_time()
+        compressed = _compress(data, encoding, level)
+        cpu_time = time.thread_time() - started
+
+        compression_stats.record(request.endpoint, len(data), len(compressed), cpu_time)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+
+        # Silny ETag dotyczy nieskompresowanej treści - po kompresji tylko słabe porównanie
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        return response
@@ -1,8 +1,9 @@
 from flask import jsonify
 from postgrest.exceptions import APIError
 from werkzeug.exceptions import HTTPException
+from .metrics import record_exception
 from .exceptions import EmailAlreadyTakenError, UsernameAlreadyTakenError, UserNotFoundError, InvalidPasswordError, \
-    ActivationFailedError
+    ActivationFailedError, PasswordServiceBusyError
 
 
 def register_error_handlers(app):
@@ -20,6 +21,7 @@ def register_error_handlers(app):
     @app.errorhandler(Exception)
     def handle_unexpected_error(e):
         print(f"Unexpected error: {str(e)}")
+        record_exception(e)
         return jsonify({"error": "Unexpected server error", "details": str(e)}), 500
 
     @app.errorhandler(UserNotFoundError)
@@ -42,5 +44,9 @@ def register_error_handlers(app):
     def handle_activation_failed(e):
         return jsonify({"error": str(e)}), 500
 
+    @app.errorhandler(PasswordServiceBusyError)
+    def handle_password_service_busy(e):
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "1"}
+
 
 
@@ -0,0 +1,62 @@
+import hashlib
+
+from flask import request, Response
+
+from app.services.supabase_client import supabase
+from app.services.query_cache import query_cache
+from app.services.schema_fallback import MISSING_COLUMN_CODES, with_schema_fallback
+
+
+def row_version(table, row_id):
+    """updated_at wiersza z indeksu wersji w cache, bez pobierania treści.
+
+    Zwraca None, gdy wiersza nie ma albo tabela nie ma jeszcze kolumny updated_at.
+    """
+    def load():
+        # limit(1) zamiast maybe_single(), które zamienia błąd 42703 na ogólny APIError
+        rows = supabase.from_(table).select("updated_at").eq("id", row_id).limit(1).execute().data
+        return rows[0] if rows else None
+
+    row = with_schema_fallback(
+        f"kolumny {table}.updated_at", MISSING_COLUMN_CODES,
+        lambda: query_cache.get_or_load(table, {"id": row_id}, load, columns="updated_at"),
+        lambda: None,
+        "odpowiedzi bez ETag"
+    )
+
+    return row.get("updated_at") if row else None
+
+
+def make_etag(*parts):
+    return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def version_etag(table, row_id, representation=""):
+    """ETag z wersji wiersza; representation rozróżnia różne odpowiedzi z tego samego wiersza."""
+    updated_at = row_version(table, row_id)
+    return make_etag(table, row_id, representation, updated_at) if updated_at else None
+
+
+def row_etag(table, row_id, row, representation=""):
+    """ETag z updated_at wiersza, który faktycznie jest wysyłany - ten sam wzór co version_etag.
+
+    Indeks wersji służy tylko do odpowiedzi 304; przy 200 ETag nie może pochodzić
+    z innego wpisu cache niż treść, bo mógłby opisywać nowszą wersję niż wysłana.
+    """
+    updated_at = row.get("updated_at") if row else None
+    return make_etag(table, row_id, representation, updated_at) if updated_at else None
+
+
+def not_modified(etag):
+    """Odpowiedź 304, jeśli If-None-Match pasuje do etag; w przeciwnym razie None."""
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+
+    return with_etag(Response(status=304), etag)
+
+
+def with_etag(response, etag):
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -17,3 +17,11 @@ class InvalidPasswordError(Exception):
 class ActivationFailedError(Exception):
     """Rzucany, gdy aktywacja konta się nie powiedzie."""
     pass
+
+class PasswordServiceBusyError(Exception):
+    """Rzucany, gdy kolejka hashowania haseł jest pełna."""
+    pass
+
+class NPlusOneQueryError(Exception):
+    """Rzucany (w trybie QUERY_DETECTOR=raise), gdy request wykonuje zbyt wiele podobnych zapytań."""
+    pass
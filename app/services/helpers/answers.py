@@ -0,0 +1,35 @@
+ANSWER_FIELDS = {
+    "point": "point",
+    "error": "error",
+    "uncertain": "uncertain",
+    "my_answer": "myAnswer",
+    "correct_answer": "correctAnswer",
+}
+
+
+def build_answer_items(task_result_id, scored_answers):
+    """Zamienia scoredAnswers na wiersze answer_items gotowe do jednego inserta.
+
+    Zwraca krotkę (rows, failed_items), gdzie failed_items opisuje
+    odpowiedzi, których nie dało się zapisać (np. brak wymaganego pola).
+    """
+    rows = []
+    failed_items = []
+
+    for answer_obj in scored_answers or []:
+        for item_id, answer_data in answer_obj.items():
+            missing = [key for key in ANSWER_FIELDS.values() if key not in (answer_data or {})]
+
+            if missing:
+                failed_items.append({
+                    "item_id": item_id,
+                    "error": f"Brakuje pól: {', '.join(missing)}"
+                })
+                continue
+
+            row = {"task_result_id": task_result_id, "item_id": item_id}
+            for column, key in ANSWER_FIELDS.items():
+                row[column] = answer_data[key]
+            rows.append(row)
+
+    return rows, failed_items
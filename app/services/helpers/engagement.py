@@ -1,7 +1,17 @@
 import math
+
+import numpy as np
+
 from .clamp import clamp
 from .difficulty import compute_difficulty_factor
-from .interactions import compute_interaction_factor
+from .interactions import compute_interaction_factor, compute_interaction_factors
+
+# Podbić przy każdej zmianie wzoru i uruchomić `flask backfill-engagement`
+ENGAGEMENT_SCORE_VERSION = 1
+
+# Kolumny z migracji 001 - bez niej wynik jest liczony przy odczycie
+ENGAGEMENT_COLUMNS = ("engagement_score", "engagement_version")
+ENGAGEMENT_COLUMNS_FEATURE = "kolumn lesson_analytics.engagement_score/engagement_version"
 
 
 def compute_engagement_score(time_spent, expected_time, scroll_depth, clicks, mouse_moves, scrolls, user_diff):
@@ -16,12 +26,36 @@ def compute_engagement_score(time_spent, expected_time, scroll_depth, clicks, mo
 
     diff_factor = compute_difficulty_factor(user_diff)
 
-    print("\n")
-    print("interaction", interaction)
-    print("difficulty", diff_factor)
-    print("scroll", scroll_term)
-    print("time", clamp(time_term, 0, 1))
+    score_raw = (
+        0.5 * time_term +
+        0.2 * scroll_term +
+        0.2 * interaction +
+        0.1 * diff_factor
+    )
+
+    score = clamp(score_raw, 0.0, 1.0) * 100
+
+    return round(score, 2)
+
+
+def compute_engagement_scores(time_spent, expected_time, scroll_depth, clicks, mouse_moves, scrolls, user_diff):
+    """Wersja wektorowa compute_engagement_score - przyjmuje kolumny (tablice) i liczy wszystkie wyniki naraz.
+
+    Kolejność działań jest taka sama jak w wersji skalarnej, więc wyniki są identyczne.
+    """
+    time_spent = np.asarray(time_spent, dtype=np.float64)
+    expected_time = np.asarray(expected_time, dtype=np.float64)
+    scroll_depth = np.asarray(scroll_depth, dtype=np.float64)
 
+    with np.errstate(divide="ignore", invalid="ignore"):
+        time_term = np.minimum(time_spent / expected_time, 1.25) / 1.25
+
+    scroll_depth = np.where(scroll_depth > 1, scroll_depth / 100.0, scroll_depth)
+    scroll_term = np.clip(scroll_depth, 0.0, 1.0)
+
+    interaction = compute_interaction_factors(clicks, mouse_moves, scrolls)
+
+    diff_factor = compute_difficulty_factor(np.asarray(user_diff, dtype=np.float64))
 
     score_raw = (
         0.5 * time_term +
@@ -30,6 +64,61 @@ def compute_engagement_score(time_spent, expected_time, scroll_depth, clicks, mo
         0.1 * diff_factor
     )
 
-    score = clamp(score_raw, 0.0, 1.0) * 100
+    score = np.clip(score_raw, 0.0, 1.0) * 100
+
+    # np.round mnoży przez 100 przed zaokrągleniem, więc przy wartościach
+    # bliskich połówki może się różnić od round() - te nieliczne liczymy jak w Pythonie
+    scaled = score * 100
+    rounded = np.round(scaled) / 100
+    ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ambiguous.any():
+        rounded[ambiguous] = [round(float(value), 2) for value in score[ambiguous]]
+
+    return rounded
+
+
+def score_analytics_row(row):
+    """Liczy wynik zaangażowania dla wiersza lesson_analytics (None, gdy brak expected_time)."""
+    expected_time = row.get("expected_time")
+    if not expected_time:
+        return None
+
+    return compute_engagement_score(
+        row.get("time_on_page") or 0,
+        expected_time,
+        row.get("scroll_depth") or 0,
+        row.get("clicks") or 0,
+        row.get("mouse_moves") or 0,
+        row.get("scrolls") or 0,
+        row.get("difficulty") or 3
+    )
+
+
+
+def score_analytics_rows(rows):
+    """Wersja wsadowa score_analytics_row - jedna lista wyników dla wielu wierszy."""
+    columns = {
+        "time_on_page": 0,
+        "expected_time": 0,
+        "scroll_depth": 0,
+        "clicks": 0,
+        "mouse_moves": 0,
+        "scrolls": 0,
+        "difficulty": 3,
+    }
+    values = {
+        column: np.fromiter((row.get(column) or default for row in rows), dtype=np.float64, count=len(rows))
+        for column, default in columns.items()
+    }
+
+    scores = compute_engagement_scores(
+        values["time_on_page"],
+        values["expected_time"],
+        values["scroll_depth"],
+        values["clicks"],
+        values["mouse_moves"],
+        values["scrolls"],
+        values["difficulty"]
+    )
 
-    return round(score, 2)
\ No newline at end of file
+    return [float(score) if expected else None for score, expected in zip(scores, values["expected_time"])]
@@ -1,18 +1,32 @@
+import numpy as np
+
 from .clamp import clamp
 
+CLICK_MAX = 20
+MOUSE_MAX = 500
+SCROLLS_MAX = 100
+
+W_CLICK = 0.2
+W_MOUSE = 0.3
+W_SCROLLS = 0.5
+
+
 def compute_interaction_factor(clicks, mouse_moves, scrolls):
-    click_max = 20
-    mouse_max = 500
-    scrolls_max = 100
+    clicks_n = clamp(clicks / max(1, CLICK_MAX))
+    mouse_n = clamp(mouse_moves / max(1, MOUSE_MAX))
+    scrolls_n= clamp(scrolls / max(1, SCROLLS_MAX))
+
+    total_w = W_CLICK + W_MOUSE + W_SCROLLS
+
+    return (clicks_n * W_CLICK + mouse_n * W_MOUSE + scrolls_n * W_SCROLLS) / total_w
 
-    w_click = 0.2
-    w_mouse = 0.3
-    w_scrolls = 0.5
 
-    clicks_n = clamp(clicks / max(1, click_max))
-    mouse_n = clamp(mouse_moves / max(1, mouse_max))
-    scrolls_n= clamp(scrolls / max(1, scrolls_max))
+def compute_interaction_factors(clicks, mouse_moves, scrolls):
+    """Wersja wektorowa compute_interaction_factor dla tablic NumPy."""
+    clicks_n = np.clip(np.asarray(clicks, dtype=np.float64) / max(1, CLICK_MAX), 0.0, 1.0)
+    mouse_n = np.clip(np.asarray(mouse_moves, dtype=np.float64) / max(1, MOUSE_MAX), 0.0, 1.0)
+    scrolls_n = np.clip(np.asarray(scrolls, dtype=np.float64) / max(1, SCROLLS_MAX), 0.0, 1.0)
 
-    total_w = w_click + w_mouse + w_scrolls
+    total_w = W_CLICK + W_MOUSE + W_SCROLLS
 
-    return (clicks_n * w_click + mouse_n * w_mouse + scrolls_n * w_scrolls) / total_w
\ No newline at end of file
+    return (clicks_n * W_CLICK + mouse_n * W_MOUSE + scrolls_n * W_SCROLLS) / total_w
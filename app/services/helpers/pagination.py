@@ -0,0 +1,54 @@
+LIST_FILTERS = ("level", "main_category", "sub_category")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+PAGINATION_HEADERS = ["X-Total-Count", "X-Next-Cursor"]
+
+
+def is_paginated(args):
+    return "limit" in args or "cursor" in args
+
+
+def wants_total_count(args):
+    """Liczba wszystkich wierszy tylko dla pierwszej strony.
+
+    Z kursorem count liczyłby tylko wiersze za kursorem, a pełne count="exact"
+    na każdej stronie kosztowałoby tyle, ile przejście całej listy.
+    """
+    return is_paginated(args) and not args.get("cursor")
+
+
+def apply_list_params(query, args):
+    """Dokłada do zapytania filtry z query stringa oraz stronicowanie po id (keyset).
+
+    Zwraca (query, limit); limit jest None, gdy klient nie prosi o stronicowanie.
+    """
+    for name in LIST_FILTERS:
+        if args.get(name):
+            query = query.eq(name, args[name])
+
+    if not is_paginated(args):
+        return query, None
+
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    cursor = args.get("cursor")
+    if cursor:
+        query = query.gt("id", cursor)
+
+    return query.order("id").limit(limit), limit
+
+
+def set_pagination_headers(response, rows, total_count, limit):
+    if total_count is not None:
+        response.headers["X-Total-Count"] = str(total_count)
+
+    if rows and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+
+    return response
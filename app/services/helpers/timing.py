@@ -0,0 +1,22 @@
+import time
+
+
+class PhaseTimer:
+    """Mierzy czas kolejnych etapów obsługi requestu (w milisekundach)."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._last = self._start
+        self.phases = {}
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    @property
+    def total_ms(self):
+        return round((time.perf_counter() - self._start) * 1000, 2)
+
+    def summary(self):
+        return {**self.phases, "total": self.total_ms}
@@ -1,10 +1,119 @@
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 
 import jwt
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", 10000))
+JWT_CACHE_DEFAULT_TTL = int(os.getenv("JWT_CACHE_DEFAULT_TTL", 300))
+
+
+class VerifiedTokenCache:
+    """LRU zweryfikowanych tokenów (po skrócie SHA-256), ważnych do czasu `exp` tokena."""
+
+    def __init__(self, max_entries=JWT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token):
+        digest = self._digest(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(digest)
+
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token, payload):
+        expires_at = payload.get("exp") or time.time() + JWT_CACHE_DEFAULT_TTL
+
+        digest = self._digest(token)
+
+        with self._lock:
+            self._entries[digest] = (payload, expires_at)
+            self._entries.move_to_end(digest)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_revoked(self, token):
+        digest = self._digest(token)
+
+        with self._lock:
+            expires_at = self._revoked.get(digest)
+            if expires_at is not None and expires_at <= time.time():
+                del self._revoked[digest]
+                return False
+            return expires_at is not None
+
+    def revoke(self, token):
+        """Usuwa token z cache i odrzuca go do czasu jego wygaśnięcia."""
+        digest = self._digest(token)
+
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False})
+        except InvalidTokenError:
+            claims = {}
+        expires_at = claims.get("exp") or time.time() + JWT_CACHE_DEFAULT_TTL
+
+        with self._lock:
+            self._entries.pop(digest, None)
+            self._revoked[digest] = expires_at
+
+    def invalidate_subject(self, sub):
+        """Usuwa z cache wszystkie tokeny użytkownika - kolejne requesty zweryfikują je od nowa."""
+        with self._lock:
+            for digest in [d for d, (payload, _) in self._entries.items() if payload.get("sub") == sub]:
+                del self._entries[digest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "revoked": len(self._revoked),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+token_cache = VerifiedTokenCache()
+
+
+def revoke_token(token):
+    token_cache.revoke(token)
+
+
+def invalidate_user_tokens(user_id):
+    token_cache.invalidate_subject(user_id)
+
+
 def decode_jwt_token(auth_header: str):
     if not auth_header:
         return None, "Brak nagłówka Authorization", 401
@@ -14,8 +123,16 @@ def decode_jwt_token(auth_header: str):
 
     token = auth_header.split(" ")[1]
 
+    if token_cache.is_revoked(token):
+        return None, "Token unieważniony", 401
+
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload, None, 200
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        token_cache.put(token, payload)
         return payload, None, 200
     except ExpiredSignatureError:
         return None, "Token wygasł", 401
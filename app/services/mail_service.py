@@ -1,6 +1,12 @@
 
+import atexit
+import heapq
+import itertools
 import os
+import queue
 import smtplib
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
@@ -9,16 +15,24 @@ from flask import render_template, current_app
 
 load_dotenv()
 
+MAIL_OUTBOX_MAX_SIZE = int(os.getenv("MAIL_OUTBOX_MAX_SIZE", 1000))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 5))
+MAIL_RETRY_BACKOFF = float(os.getenv("MAIL_RETRY_BACKOFF", 2))
+MAIL_SMTP_IDLE_TIMEOUT = float(os.getenv("MAIL_SMTP_IDLE_TIMEOUT", 60))
+MAIL_SHUTDOWN_TIMEOUT = float(os.getenv("MAIL_SHUTDOWN_TIMEOUT", 10))
 
-def send_email(subject, body, to_email=None, reply_to=None, is_html=False):
-    """Podstawowa funkcja wysyłania emaili"""
-    from_email = os.getenv("FROM_EMAIL")
-    default_to_email = os.getenv("TO_EMAIL")
-    password = os.getenv("EMAIL_PASSWD")
-    smtp_server = os.getenv("SMTP_SERVER")
-    port = int(os.getenv("SMTP_PORT", 587))
 
-    recipient = to_email or default_to_email
+def _smtp_settings():
+    return {
+        "from_email": os.getenv("FROM_EMAIL"),
+        "password": os.getenv("EMAIL_PASSWD"),
+        "smtp_server": os.getenv("SMTP_SERVER"),
+        "port": int(os.getenv("SMTP_PORT", 587)),
+    }
+
+
+def _build_message(subject, body, to_email=None, reply_to=None, is_html=False):
+    recipient = to_email or os.getenv("TO_EMAIL")
 
     msg = MIMEMultipart()
     msg["From"] = "Czas na niemiecki"
@@ -31,11 +45,24 @@ def send_email(subject, body, to_email=None, reply_to=None, is_html=False):
     content_type = "html" if is_html else "plain"
     msg.attach(MIMEText(body, content_type))
 
+    return recipient, msg
+
+
+def _connect(settings):
+    server = smtplib.SMTP(settings["smtp_server"], settings["port"])
+    server.starttls()
+    server.login(settings["from_email"], settings["password"])
+    return server
+
+
+def send_email(subject, body, to_email=None, reply_to=None, is_html=False):
+    """Podstawowa funkcja wysyłania emaili"""
+    settings = _smtp_settings()
+    recipient, msg = _build_message(subject, body, to_email, reply_to, is_html)
+
     try:
-        server = smtplib.SMTP(smtp_server, port)
-        server.starttls()
-        server.login(from_email, password)
-        server.sendmail(from_email, recipient, msg.as_string())
+        server = _connect(settings)
+        server.sendmail(settings["from_email"], recipient, msg.as_string())
         server.quit()
 
         print("wysłany")
@@ -44,6 +71,134 @@ def send_email(subject, body, to_email=None, reply_to=None, is_html=False):
         return False, f"Błąd: {e}"
 
 
+class MailOutbox:
+    """Kolejka e-maili wysyłanych w tle przez jedno, ponownie używane połączenie SMTP.
+
+    Nieudane wysyłki są ponawiane z wykładniczym opóźnieniem, a połączenie
+    jest zamykane po MAIL_SMTP_IDLE_TIMEOUT sekundach bez wiadomości.
+    """
+
+    def __init__(self, max_size=MAIL_OUTBOX_MAX_SIZE, max_attempts=MAIL_MAX_ATTEMPTS,
+                 retry_backoff=MAIL_RETRY_BACKOFF, idle_timeout=MAIL_SMTP_IDLE_TIMEOUT):
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize=max_size)
+        self._retries = []
+        self._sequence = itertools.count()
+        self._server = None
+        self._last_used = 0.0
+        self._worker = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.connections = 0
+
+    def enqueue(self, subject, body, to_email=None, reply_to=None, is_html=False):
+        recipient, msg = _build_message(subject, body, to_email, reply_to, is_html)
+
+        try:
+            self._queue.put_nowait((recipient, msg.as_string(), 1))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False, "Kolejka e-maili jest pełna"
+
+        with self._lock:
+            self.queued += 1
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="mail-outbox", daemon=True)
+                self._worker.start()
+
+        return True, "E-mail dodany do kolejki"
+
+    def _next_item(self):
+        now = time.monotonic()
+        if self._retries and self._retries[0][0] <= now:
+            return heapq.heappop(self._retries)[2], False
+
+        timeout = self._retries[0][0] - now if self._retries else self.idle_timeout
+        try:
+            return self._queue.get(timeout=timeout), True
+        except queue.Empty:
+            return None, False
+
+    def _run(self):
+        while True:
+            item, from_queue = self._next_item()
+
+            if item is None:
+                if self._server is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+                    self._disconnect()
+                continue
+
+            self._deliver(*item)
+            if from_queue:
+                self._queue.task_done()
+
+    def _deliver(self, recipient, message, attempt):
+        settings = _smtp_settings()
+
+        try:
+            if self._server is None:
+                self._server = _connect(settings)
+                self.connections += 1
+            self._server.sendmail(settings["from_email"], recipient, message)
+            self._last_used = time.monotonic()
+        except Exception as e:
+            self._disconnect()
+
+            if attempt >= self.max_attempts:
+                print(f"Nie udało się wysłać e-maila do {recipient} po {attempt} próbach: {e}")
+                with self._lock:
+                    self.failed += 1
+                return
+
+            delay = self.retry_backoff * 2 ** (attempt - 1)
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), (recipient, message, attempt + 1)))
+            with self._lock:
+                self.retried += 1
+            return
+
+        with self._lock:
+            self.sent += 1
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+    def flush(self, timeout=MAIL_SHUTDOWN_TIMEOUT):
+        """Czeka (maks. timeout sekund), aż kolejka zostanie opróżniona."""
+        deadline = time.monotonic() + timeout
+        while (self._queue.unfinished_tasks or self._retries) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "rejected": self.rejected,
+                "pending": self._queue.qsize() + len(self._retries),
+                "connections": self.connections,
+            }
+
+
+mail_outbox = MailOutbox()
+atexit.register(mail_outbox.flush)
+
+
 def send_activation_email(name, user_email, user_id):
     base_url = os.getenv("BASE_URL", "http://localhost:5000")
     activation_link = f"{base_url}/auth/activate/{user_id}"
@@ -57,7 +212,7 @@ def send_activation_email(name, user_email, user_id):
             user_id=user_id
         )
 
-        return send_email(
+        return mail_outbox.enqueue(
             subject="Aktywuj swoje konto",
             body=html_body,
             to_email=user_email,
@@ -72,7 +227,7 @@ def send_welcome_email(name, user_email):
     """Email powitalny (po aktywacji)"""
     try:
         html_body = render_template('emails/welcome.html', name=name, email=user_email)
-        return send_email(
+        return mail_outbox.enqueue(
             subject="Witamy w naszym serwisie!",
             body=html_body,
             to_email=user_email,
@@ -94,7 +249,7 @@ def send_password_reset_email(user_email, user_id):
             user_id=user_id
         )
 
-        return send_email(
+        return mail_outbox.enqueue(
             subject="Resetowanie hasła",
             body=html_body,
             to_email=user_email,
@@ -0,0 +1,267 @@
+import contextvars
+import hmac
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from flask import request, g, Response
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = defaultdict(float)
+
+    def inc(self, labels, value=1):
+        with _lock:
+            self._values[labels] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with _lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        with _lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+
+        with _lock:
+            for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Czas obsługi requestu.", ("endpoint", "method"), LATENCY_BUCKETS
+)
+REQUESTS = Counter("http_requests_total", "Liczba requestów według statusu.", ("endpoint", "method", "status"))
+REQUEST_SIZE = Histogram("http_request_size_bytes", "Rozmiar ciała requestu.", ("endpoint",), SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Rozmiar wysłanej odpowiedzi (po kompresji).", ("endpoint",), SIZE_BUCKETS
+)
+SUPABASE_CALLS = Histogram(
+    "supabase_calls_per_request", "Liczba wywołań PostgREST w jednym requeście.", ("endpoint",), CALL_COUNT_BUCKETS
+)
+SUPABASE_TIME = Counter(
+    "supabase_request_time_seconds_total", "Łączny czas wywołań PostgREST wykonanych w requestach.", ("endpoint",)
+)
+EXCEPTIONS = Counter("app_unhandled_exceptions_total", "Nieoczekiwane wyjątki według typu.", ("endpoint", "type"))
+
+METRICS = [REQUEST_LATENCY, REQUESTS, REQUEST_SIZE, RESPONSE_SIZE, SUPABASE_CALLS, SUPABASE_TIME, EXCEPTIONS]
+
+
+class RequestCalls:
+    """Wywołania PostgREST wykonane w ramach jednego requestu (także z wątków run_queries)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.time = 0.0
+        self.listeners = []
+
+    def record(self, http_request, elapsed):
+        with self._lock:
+            self.count += 1
+            self.time += elapsed
+
+        for listener in self.listeners:
+            listener(http_request, elapsed)
+
+
+_request_calls = contextvars.ContextVar("supabase_request_calls", default=None)
+
+
+def start_request_calls():
+    """Zaczyna zliczanie wywołań dla bieżącego requestu; zwraca token dla end_request_calls."""
+    return _request_calls.set(RequestCalls())
+
+
+def end_request_calls(token):
+    try:
+        _request_calls.reset(token)
+    except ValueError:
+        # teardown w innym kontekście (np. po odpowiedzi strumieniowanej)
+        _request_calls.set(None)
+
+
+def record_supabase_call(http_request, elapsed):
+    """Wołane przez transport klienta Supabase po każdym wywołaniu PostgREST."""
+    calls = _request_calls.get()
+    if calls is not None:
+        calls.record(http_request, elapsed)
+
+
+def current_request_calls():
+    return _request_calls.get()
+
+
+def record_exception(e):
+    EXCEPTIONS.inc((request.endpoint or "unmatched", type(e).__name__))
+
+
+_stats_sources = {}
+
+
+def register_stats_source(name, stats):
+    """Dodaje do /metrics liczbowe pola słownika zwracanego przez stats()."""
+    _stats_sources[name] = stats
+
+
+def _metric_name(*parts):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(parts))
+
+
+def _render_stats_sources():
+    lines = []
+
+    for source, stats in sorted(_stats_sources.items()):
+        try:
+            values = stats()
+        except Exception as e:
+            print(f"Nie udało się pobrać statystyk {source}: {e}")
+            continue
+
+        for key, value in values.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if not isinstance(value, (int, float)):
+                continue
+
+            name = _metric_name("app", source, key)
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+    return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(_render_stats_sources())
+    return "\n".join(lines) + "\n"
+
+
+def register_metrics(app):
+    """Histogramy czasu, statusy, rozmiary i wywołania Supabase per endpoint, wystawione pod /metrics.
+
+    /metrics pokazuje nazwy endpointów, typy wyjątków i stan wewnętrznych kolejek,
+    więc bez METRICS_TOKEN metryki nie są włączane.
+    """
+    # Moduł jest importowany przed load_dotenv (przez error_handler), więc konfiguracja czytana jest tutaj
+    if os.getenv("METRICS_ENABLED", "true").lower() != "true":
+        return
+
+    metrics_token = os.getenv("METRICS_TOKEN")
+    if not metrics_token:
+        print("Brak METRICS_TOKEN - /metrics wyłączone")
+        return
+
+    from app.services.supabase_client import get_pool_stats
+    from app.services.query_cache import query_cache
+    from app.services.jwt_check import token_cache
+    from app.services.password_service import password_service
+    from app.services.mail_service import mail_outbox
+    from app.services.write_buffer import lesson_analytics_buffer
+    from app.services.compression import compression_stats
+
+    register_stats_source("supabase_pool", get_pool_stats)
+    register_stats_source("query_cache", query_cache.stats)
+    register_stats_source("jwt_cache", token_cache.stats)
+    register_stats_source("password_service", password_service.stats)
+    register_stats_source("mail_outbox", mail_outbox.stats)
+    register_stats_source("lesson_analytics_buffer", lesson_analytics_buffer.stats)
+    register_stats_source("compression", compression_stats.stats)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_token = start_request_calls()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_LATENCY.observe((endpoint, request.method), time.perf_counter() - started)
+        REQUESTS.inc((endpoint, request.method, str(response.status_code)))
+        REQUEST_SIZE.observe((endpoint,), request.content_length or 0)
+
+        # Odpowiedzi strumieniowane nie mają znanej długości
+        if response.content_length is not None:
+            RESPONSE_SIZE.observe((endpoint,), response.content_length)
+
+        calls = _request_calls.get()
+        if calls is not None:
+            SUPABASE_CALLS.observe((endpoint,), calls.count)
+            SUPABASE_TIME.inc((endpoint,), calls.time)
+
+        return response
+
+    @app.teardown_request
+    def reset_request_metrics(exc):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            end_request_calls(token)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {metrics_token}".encode()):
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+from app.services.exceptions import PasswordServiceBusyError
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", min(os.cpu_count() or 2, 4)))
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", PASSWORD_WORKERS * 4))
+
+
+def _mp_context():
+    # Fork z wielowątkowego procesu serwera kopiuje zajęte locki (klient HTTP, outbox maili).
+    # Forkserver ładuje tylko ten moduł - bez run.py, które przy imporcie wywołuje create_app.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check(password, password_hash):
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+class PasswordService:
+    """Hashowanie i weryfikacja haseł w osobnych procesach.
+
+    Liczba oczekujących operacji jest ograniczona - po przekroczeniu limitu
+    rzucany jest PasswordServiceBusyError (429), zamiast blokować wątki
+    obsługujące pozostałe endpointy.
+    """
+
+    def __init__(self, workers=PASSWORD_WORKERS, max_queue=PASSWORD_MAX_QUEUE, rounds=BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.total_time = 0.0
+
+    def _get_executor(self):
+        # Pula tworzona przy pierwszym użyciu, żeby procesy nie powstawały przy imporcie
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+        return self._executor
+
+    def _replace_broken_executor(self, executor):
+        """Po śmierci procesu roboczego pula jest bezużyteczna - tworzona jest nowa."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+            executor = self._get_executor()
+
+        return executor
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordServiceBusyError("Serwer haseł jest przeciążony, spróbuj ponownie za chwilę.")
+
+            self._pending += 1
+            self.peak_pending = max(self.peak_pending, self._pending)
+            executor = self._get_executor()
+
+        start = time.perf_counter()
+        try:
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                print("Pula procesów haseł uległa awarii, tworzę nową")
+                executor.shutdown(wait=False, cancel_futures=True)
+                return self._replace_broken_executor(executor).submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+                self.total_time += time.perf_counter() - start
+
+    def hash_password(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def check_password(self, password, password_hash):
+        return self._run(_check, password, password_hash)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "rounds": self.rounds,
+                "in_flight": self._pending,
+                "queue_depth": max(0, self._pending - self.workers),
+                "peak_in_flight": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+                "avg_ms": round(self.total_time / self.completed * 1000, 2) if self.completed else 0,
+            }
+
+
+password_service = PasswordService()
+
+
+def hash_password(password):
+    return password_service.hash_password(password)
+
+
+def check_password(password, password_hash):
+    return password_service.check_password(password, password_hash)
@@ -0,0 +1,25 @@
+from app.services.query_cache import query_cache
+
+PLACEMENT_TEST_OWNER_ID = "aa9792f9-6bc2-4078-aa1d-2364f68b41db"
+
+PLACEMENT_TEST_COLUMNS = "*, task_items(*)"
+
+
+def get_placement_test(level, loader):
+    """Złożony test dla poziomu z query_cache (wygasa po QUERY_CACHE_TTL) albo z loader().
+
+    Cache jest lokalny dla procesu - TTL ogranicza, jak długo inne workery
+    i zmiany zrobione bezpośrednio w Supabase widzą starą wersję testu.
+    Zwracana lista jest współdzielona między requestami - nie modyfikować.
+    """
+    return query_cache.get_or_load(
+        "tasks", {"level": level, "owner_id": PLACEMENT_TEST_OWNER_ID}, loader, columns=PLACEMENT_TEST_COLUMNS
+    )
+
+
+def invalidate_placement_tests(owner_id=None):
+    """Czyści cache testów; gdy podano owner_id, tylko jeśli to właściciel testu."""
+    if owner_id is not None and owner_id != PLACEMENT_TEST_OWNER_ID:
+        return
+
+    query_cache.invalidate("tasks", owner_id=PLACEMENT_TEST_OWNER_ID)
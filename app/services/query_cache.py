@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 60))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 5000))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+
+def _estimate_size(value):
+    return len(json.dumps(value, default=str))
+
+
+class QueryCache:
+    """Cache read-through dla rzadko zmieniających się wierszy.
+
+    Klucz to (tabela, kolumny, filtry). Wpisy wygasają po TTL, a przy
+    przekroczeniu limitu wpisów lub pamięci usuwane są najdawniej używane.
+    """
+
+    def __init__(self, ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_MAX_ENTRIES, max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(table, columns, filters):
+        return table, columns, tuple(sorted((name, str(value)) for name, value in filters.items()))
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _set(self, key, value):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_or_load(self, table, filters, loader, columns="*"):
+        """Zwraca dane z cache albo wywołuje loader() i zapamiętuje wynik (poza None)."""
+        key = self._key(table, columns, filters)
+
+        value = self._get(key)
+        if value is not None:
+            return value
+
+        value = loader()
+        if value is not None:
+            self._set(key, value)
+
+        return value
+
+    def get_many(self, table, column, values, loader, columns="*"):
+        """Zwraca słownik wartość -> wiersz; loader(brakujące) dociąga brakujące wiersze jednym zapytaniem."""
+        found = {}
+        missing = []
+
+        for value in values:
+            row = self._get(self._key(table, columns, {column: value}))
+            if row is None:
+                missing.append(value)
+            else:
+                found[value] = row
+
+        if missing:
+            for row in loader(missing) or []:
+                self._set(self._key(table, columns, {column: row[column]}), row)
+                found[row[column]] = row
+
+        return found
+
+    def invalidate(self, table, **filters):
+        """Usuwa wpisy tabeli; z filtrami - tylko te, których filtry się zgadzają."""
+        expected = {(name, str(value)) for name, value in filters.items()}
+
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == table and expected.issubset(key[2]):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+query_cache = QueryCache()
@@ -0,0 +1,136 @@
+import os
+import threading
+import traceback
+from collections import Counter, defaultdict
+
+from flask import request, g
+
+from app.services.exceptions import NPlusOneQueryError
+from app.services.metrics import current_request_calls, start_request_calls, end_request_calls, register_stats_source
+
+QUERY_DETECTOR_MODE = os.getenv("QUERY_DETECTOR", "off").lower()
+QUERY_DETECTOR_THRESHOLD = int(os.getenv("QUERY_DETECTOR_THRESHOLD", 5))
+
+# Parametry opisujące kształt zapytania - reszta to filtry, z których zostaje sam operator
+STRUCTURAL_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_INTERNAL_FILES = {
+    os.path.join(_APP_DIR, "services", name)
+    for name in ("supabase_client.py", "metrics.py", "query_detector.py")
+}
+
+
+def fingerprint(http_request):
+    """Zapytanie bez konkretnych wartości filtrów, np. `GET task_items task_id=eq.?&select=*`."""
+    params = []
+    for name, value in http_request.url.params.multi_items():
+        if name in STRUCTURAL_PARAMS:
+            params.append(f"{name}={value}")
+        else:
+            operator = value.split(".", 1)[0] if "." in value else ""
+            params.append(f"{name}={operator}.?")
+
+    table = http_request.url.path.rsplit("/rest/v1/", 1)[-1]
+    return f"{http_request.method} {table} {'&'.join(sorted(params))}".strip()
+
+
+def _call_site():
+    """Najgłębsza ramka z kodu aplikacji (poza klientem Supabase i instrumentacją)."""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(_APP_DIR) and frame.filename not in _INTERNAL_FILES:
+            return f"{os.path.relpath(frame.filename, os.path.dirname(_APP_DIR))}:{frame.lineno} ({frame.name})"
+    return "nieznane miejsce"
+
+
+class QueryLog:
+    """Odciski zapytań jednego requestu razem z miejscami, z których padły."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self.sites = defaultdict(Counter)
+
+    def __call__(self, http_request, elapsed):
+        key = fingerprint(http_request)
+        site = _call_site()
+
+        with self._lock:
+            self.counts[key] += 1
+            self.sites[key][site] += 1
+
+    def repeated(self, threshold):
+        with self._lock:
+            return [(key, count, dict(self.sites[key])) for key, count in self.counts.items() if count > threshold]
+
+
+class DetectorStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.flagged = 0
+
+    def record(self, flagged):
+        with self._lock:
+            self.requests += 1
+            self.flagged += int(flagged)
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "flagged_requests": self.flagged}
+
+
+detector_stats = DetectorStats()
+
+
+def _format_report(endpoint, repeated, threshold):
+    lines = [f"N+1: {endpoint} wykonał więcej niż {threshold} podobnych zapytań"]
+    for key, count, sites in repeated:
+        lines.append(f"  {count}x {key}")
+        for site, site_count in sorted(sites.items(), key=lambda item: -item[1]):
+            lines.append(f"    {site_count}x z {site}")
+    return "\n".join(lines)
+
+
+def register_query_detector(app, mode=QUERY_DETECTOR_MODE, threshold=QUERY_DETECTOR_THRESHOLD):
+    """Wykrywanie N+1 w dev/staging: QUERY_DETECTOR=warn wypisuje raport, raise kończy request błędem."""
+    if mode not in ("warn", "raise"):
+        return
+
+    register_stats_source("query_detector", detector_stats.stats)
+
+    @app.before_request
+    def start_query_log():
+        calls = current_request_calls()
+        if calls is None:
+            # Bez register_metrics detektor sam zakłada licznik wywołań
+            g.query_detector_token = start_request_calls()
+            calls = current_request_calls()
+
+        g.query_log = QueryLog()
+        calls.listeners.append(g.query_log)
+
+    @app.after_request
+    def check_query_log(response):
+        query_log = g.pop("query_log", None)
+        if query_log is None:
+            return response
+
+        repeated = query_log.repeated(threshold)
+        detector_stats.record(bool(repeated))
+        if not repeated:
+            return response
+
+        report = _format_report(request.endpoint or request.path, repeated, threshold)
+        if mode == "raise":
+            raise NPlusOneQueryError(report)
+
+        print(report)
+        return response
+
+    @app.teardown_request
+    def end_query_log(exc):
+        token = g.pop("query_detector_token", None)
+        if token is not None:
+            end_request_calls(token)
@@ -0,0 +1,25 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+QUERY_EXECUTOR_WORKERS = int(os.getenv("QUERY_EXECUTOR_WORKERS", 8))
+
+_executor = ThreadPoolExecutor(max_workers=QUERY_EXECUTOR_WORKERS, thread_name_prefix="supabase-query")
+
+
+def run_queries(**queries):
+    """Wykonuje niezależne zapytania PostgREST równolegle.
+
+    Przyjmuje nazwane buildery zapytań (lub funkcje bez argumentów) i zwraca
+    słownik nazwa -> odpowiedź. Pierwszy błąd (np. APIError) jest rzucany dalej.
+    Zapytania działają w kopii kontekstu requestu, więc liczą się do jego metryk.
+    """
+    futures = {
+        name: _executor.submit(
+            contextvars.copy_context().run,
+            query.execute if hasattr(query, "execute") else query
+        )
+        for name, query in queries.items()
+    }
+
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,38 @@
+from app.services.supabase_client import supabase
+from app.services.schema_fallback import MISSING_FUNCTION_CODES, with_schema_fallback
+
+
+def _call_paged(function_name, params, page_size, order):
+    rows = []
+
+    while True:
+        query = supabase.rpc(function_name, params)
+        for column in order:
+            query = query.order(column)
+
+        page = query.range(len(rows), len(rows) + page_size - 1).execute().data or []
+        rows.extend(page)
+
+        if len(page) < page_size:
+            return rows
+
+
+def call_rpc(function_name, params, page_size=None, order=()):
+    """Wywołuje funkcję SQL przez supabase.rpc.
+
+    Zwraca None, jeśli funkcji nie ma w bazie (migracja nie została
+    zastosowana) - wywołujący przechodzi wtedy na ścieżkę w Pythonie.
+    Z page_size wynik jest pobierany stronami uporządkowanymi po kolumnach
+    order, bo PostgREST obcina także wyniki funkcji do max-rows.
+    """
+    def call():
+        if page_size is None:
+            return supabase.rpc(function_name, params).execute().data
+        return _call_paged(function_name, params, page_size, order)
+
+    return with_schema_fallback(
+        f"funkcji {function_name}", MISSING_FUNCTION_CODES,
+        call,
+        lambda: None,
+        "używam agregacji w Pythonie"
+    )
@@ -0,0 +1,32 @@
+from postgrest.exceptions import APIError
+
+# 42703 - brak kolumny w Postgresie, PGRST204 - PostgREST nie zna kolumny przy zapisie
+MISSING_COLUMN_CODES = {"42703", "PGRST204"}
+# PGRST202 - PostgREST nie zna funkcji, 42883 - brak funkcji w Postgresie
+MISSING_FUNCTION_CODES = {"PGRST202", "42883"}
+
+_missing = set()
+
+
+def is_missing(feature):
+    return feature in _missing
+
+
+def with_schema_fallback(feature, codes, call, fallback, note):
+    """Wywołuje call(); gdy baza nie zna obiektu z migracji (kod błędu z codes), zwraca fallback().
+
+    Brak jest zapamiętywany w procesie i logowany raz, kolejne wywołania idą
+    od razu do fallback().
+    """
+    if feature in _missing:
+        return fallback()
+
+    try:
+        return call()
+    except APIError as e:
+        if e.code not in codes:
+            raise
+
+        print(f"Brak {feature} w bazie (migracja nie została zastosowana), {note}")
+        _missing.add(feature)
+        return fallback()
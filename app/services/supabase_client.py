@@ -1,9 +1,137 @@
 import os
-from supabase import create_client, Client
+import threading
+import time
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client, ClientOptions
+
+from app.services.metrics import record_supabase_call
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_API_KEY = os.getenv("SUPABASE_API_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_API_KEY)
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", 20))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", 10))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", 30))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", 10))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", 5))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", 5))
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """Transport HTTP ze współdzieloną pulą połączeń i licznikami jej użycia."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.failed_requests = 0
+        self.total_time = 0.0
+
+    def handle_request(self, request):
+        with self._stats_lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        start = time.perf_counter()
+        try:
+            return super().handle_request(request)
+        except Exception:
+            with self._stats_lock:
+                self.failed_requests += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self.in_flight -= 1
+                self.total_requests += 1
+                self.total_time += elapsed
+
+            record_supabase_call(request, elapsed)
+
+    def stats(self):
+        connections = self._pool.connections
+
+        with self._stats_lock:
+            return {
+                "max_connections": SUPABASE_POOL_MAX_CONNECTIONS,
+                "max_keepalive_connections": SUPABASE_POOL_MAX_KEEPALIVE,
+                "http2": SUPABASE_HTTP2,
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "total_requests": self.total_requests,
+                "failed_requests": self.failed_requests,
+                "avg_request_ms": round(self.total_time / self.total_requests * 1000, 2)
+                if self.total_requests else 0,
+            }
+
+
+_transport = PooledTransport(
+    http2=SUPABASE_HTTP2,
+    limits=httpx.Limits(
+        max_connections=SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+    ),
+)
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """Klient PostgREST korzystający z globalnej puli połączeń zamiast własnej."""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            transport=_transport,
+        )
+
+
+class PooledClient(Client):
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=SUPABASE_TIMEOUT, verify=True, proxy=None):
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_supabase_client() -> Client:
+    """Zwraca współdzielonego klienta Supabase.
+
+    Klient jest bezpieczny wątkowo - wszystkie wątki korzystają z jednej puli
+    połączeń keep-alive (HTTP/2), więc nie płacą za ponowny handshake TLS.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                options = ClientOptions(
+                    postgrest_client_timeout=httpx.Timeout(
+                        SUPABASE_TIMEOUT,
+                        connect=SUPABASE_CONNECT_TIMEOUT,
+                        pool=SUPABASE_POOL_TIMEOUT,
+                    )
+                )
+                _client = PooledClient.create(SUPABASE_URL, SUPABASE_API_KEY, options)
+
+    return _client
+
+
+def get_pool_stats():
+    return _transport.stats()
 
 
+supabase: Client = get_supabase_client()
@@ -0,0 +1,204 @@
+import atexit
+import os
+import threading
+import time
+
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+
+from app.services.supabase_client import supabase
+from app.services.helpers.engagement import ENGAGEMENT_COLUMNS, ENGAGEMENT_COLUMNS_FEATURE
+from app.services.schema_fallback import MISSING_COLUMN_CODES, with_schema_fallback
+
+ANALYTICS_BUFFER_ENABLED = os.getenv("ANALYTICS_BUFFER_ENABLED", "true").lower() == "true"
+ANALYTICS_BUFFER_MAX_ROWS = int(os.getenv("ANALYTICS_BUFFER_MAX_ROWS", 200))
+ANALYTICS_BUFFER_FLUSH_MS = int(os.getenv("ANALYTICS_BUFFER_FLUSH_MS", 1000))
+ANALYTICS_BUFFER_MAX_PENDING = int(os.getenv("ANALYTICS_BUFFER_MAX_PENDING", 10000))
+
+# Klasy SQLSTATE błędów danych (22) i naruszeń ograniczeń (23) - dotyczą pojedynczych wierszy
+ROW_SQLSTATE_CLASSES = ("22", "23")
+# Błędy zapytania i uprawnień (42, np. 42703, 42501) oraz schematu PostgREST (PGRST1xx/2xx)
+# dotyczą całej paczki - dzielenie jej nic nie da
+SCHEMA_SQLSTATE_CLASSES = ("42",)
+SCHEMA_POSTGREST_PREFIXES = ("PGRST1", "PGRST2")
+
+
+def _error_code(e):
+    return str(e.code) if isinstance(e, APIError) and e.code else ""
+
+
+def _is_row_error(e):
+    """Błąd konkretnego wiersza (np. 23503 dla nieistniejącego lessonId) - ponowienie go nic nie da."""
+    code = _error_code(e)
+    return len(code) == 5 and code[:2] in ROW_SQLSTATE_CLASSES
+
+
+def _is_schema_error(e):
+    """Brak kolumny/tabeli albo uprawnień - wymaga migracji lub poprawki konfiguracji, nie dotyczy wierszy."""
+    code = _error_code(e)
+    return code.startswith(SCHEMA_POSTGREST_PREFIXES) or (len(code) == 5 and code[:2] in SCHEMA_SQLSTATE_CLASSES)
+
+
+class WriteBehindBuffer:
+    """Zbiera wiersze w pamięci i zapisuje je jednym insertem.
+
+    Zapis następuje po zebraniu max_rows wierszy albo po flush_ms od
+    pierwszego niezapisanego wiersza. Przy błędzie przejściowym albo błędzie
+    schematu/uprawnień wiersze wracają do bufora (maks. max_pending, nadmiar
+    jest odrzucany i liczony). Przy błędzie danych konkretnego wiersza paczka
+    jest dzielona na pół, aż zostaną same błędne wiersze - te są odrzucane,
+    a reszta zapisywana.
+
+    optional_columns to (nazwa dla schema_fallback, kolumny) - gdy baza ich
+    nie zna (migracja nie została zastosowana), wiersze zapisywane są bez nich.
+    """
+
+    def __init__(self, table, max_rows=ANALYTICS_BUFFER_MAX_ROWS, flush_ms=ANALYTICS_BUFFER_FLUSH_MS,
+                 max_pending=ANALYTICS_BUFFER_MAX_PENDING, enabled=ANALYTICS_BUFFER_ENABLED, optional_columns=None):
+        self.table = table
+        self.optional_columns = optional_columns
+        self.max_rows = max_rows
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self._rows = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self.rows_added = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.schema_errors = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+
+    def _insert(self, rows):
+        def insert(rows):
+            supabase.from_(self.table).insert(rows, returning=ReturnMethod.minimal).execute()
+
+        if not self.optional_columns:
+            return insert(rows)
+
+        feature, columns = self.optional_columns
+        with_schema_fallback(
+            feature, MISSING_COLUMN_CODES,
+            lambda: insert(rows),
+            lambda: insert([{key: value for key, value in row.items() if key not in columns} for row in rows]),
+            "zapisuję wiersze bez nich"
+        )
+
+    def add(self, row):
+        self.add_many([row])
+
+    def add_many(self, rows):
+        if not rows:
+            return
+
+        if not self.enabled:
+            self._insert(rows)
+            with self._condition:
+                self.rows_added += len(rows)
+                self.rows_written += len(rows)
+            return
+
+        with self._condition:
+            self._rows.extend(rows)
+            self.rows_added += len(rows)
+            self._trim()
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"{self.table}-buffer", daemon=True)
+                self._worker.start()
+
+            if len(self._rows) >= self.max_rows:
+                self._condition.notify()
+
+    def _trim(self):
+        overflow = len(self._rows) - self.max_pending
+        if overflow > 0:
+            del self._rows[:overflow]
+            self.rows_dropped += overflow
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._rows, timeout=None)
+                self._condition.wait_for(lambda: len(self._rows) >= self.max_rows, timeout=self.flush_interval)
+
+            if not self.flush():
+                time.sleep(self.flush_interval)
+
+    def flush(self):
+        """Zapisuje wszystkie zebrane wiersze (po max_rows na insert); False, gdy wiersze wróciły do bufora."""
+        with self._flush_lock:
+            with self._condition:
+                rows, self._rows = self._rows, []
+
+            pending = [rows[start:start + self.max_rows] for start in range(0, len(rows), self.max_rows)]
+
+            while pending:
+                batch = pending.pop(0)
+                started = time.perf_counter()
+
+                try:
+                    self._insert(batch)
+                except Exception as e:
+                    if not _is_row_error(e):
+                        remaining = [row for chunk in [batch] + pending for row in chunk]
+                        schema_error = _is_schema_error(e)
+
+                        if schema_error:
+                            print(
+                                f"BŁĄD: baza odrzuca zapis do {self.table} ({e.code}: {e.message}) - "
+                                f"{len(remaining)} wierszy czeka w buforze, sprawdź migracje i uprawnienia"
+                            )
+                        else:
+                            print(f"Nie udało się zapisać {len(remaining)} wierszy do {self.table}, ponowię: {e}")
+
+                        with self._condition:
+                            self.failed_flushes += 1
+                            self.schema_errors += int(schema_error)
+                            self._rows[:0] = remaining
+                            self._trim()
+                        return False
+
+                    if len(batch) == 1:
+                        print(f"Odrzucono wiersz {self.table}: {e}")
+                        with self._condition:
+                            self.rows_dropped += 1
+                        continue
+
+                    middle = len(batch) // 2
+                    pending[:0] = [batch[:middle], batch[middle:]]
+                    continue
+
+                elapsed = time.perf_counter() - started
+                with self._condition:
+                    self.flushes += 1
+                    self.rows_written += len(batch)
+                    self.total_flush_time += elapsed
+                    self.max_flush_time = max(self.max_flush_time, elapsed)
+
+        return True
+
+    def stats(self):
+        with self._condition:
+            return {
+                "depth": len(self._rows),
+                "rows_added": self.rows_added,
+                "rows_written": self.rows_written,
+                "rows_dropped": self.rows_dropped,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "schema_errors": self.schema_errors,
+                "avg_flush_ms": round(self.total_flush_time / self.flushes * 1000, 2) if self.flushes else 0,
+                "max_flush_ms": round(self.max_flush_time * 1000, 2),
+            }
+
+
+lesson_analytics_buffer = WriteBehindBuffer(
+    "lesson_analytics", optional_columns=(ENGAGEMENT_COLUMNS_FEATURE, ENGAGEMENT_COLUMNS)
+)
+atexit.register(lesson_analytics_buffer.flush)
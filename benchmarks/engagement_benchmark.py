@@ -0,0 +1,45 @@
+"""Porównanie skalarnego i wektorowego liczenia wyniku zaangażowania.
+
+Uruchomienie: python -m benchmarks.engagement_benchmark
+"""
+import time
+
+import numpy as np
+
+from app.services.helpers.engagement import compute_engagement_score, compute_engagement_scores
+
+
+def make_columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "time_spent": rng.integers(0, 2000, n),
+        "expected_time": rng.integers(1, 1000, n),
+        "scroll_depth": np.where(rng.random(n) < 0.5, rng.random(n), rng.integers(0, 101, n)),
+        "clicks": rng.integers(0, 40, n),
+        "mouse_moves": rng.integers(0, 1000, n),
+        "scrolls": rng.integers(0, 200, n),
+        "user_diff": rng.integers(1, 6, n),
+    }
+
+
+def run(n):
+    columns = make_columns(n)
+    rows = list(zip(*(column.tolist() for column in columns.values())))
+
+    start = time.perf_counter()
+    scalar = [compute_engagement_score(*row) for row in rows]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vector = compute_engagement_scores(**columns)
+    vector_time = time.perf_counter() - start
+
+    assert scalar == vector.tolist(), "wyniki wersji wektorowej różnią się od skalarnej"
+
+    print(f"{n:>9} wierszy: skalarnie {scalar_time * 1000:9.1f} ms, "
+          f"wektorowo {vector_time * 1000:7.1f} ms, przyspieszenie x{scalar_time / vector_time:.0f}")
+
+
+if __name__ == "__main__":
+    for n in (10_000, 1_000_000):
+        run(n)
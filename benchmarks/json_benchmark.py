@@ -0,0 +1,119 @@
+"""Serializacja odpowiedzi analitycznych: domyślny provider Flaska vs FastJSONProvider.
+
+Dane mają kształt odpowiedzi get_task_analytics i get_class_analytics.
+
+Uruchomienie: python -m benchmarks.json_benchmark
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.services.json_provider import FastJSONProvider, orjson
+
+REPEATS = 20
+
+
+def make_task_analytics(tasks=60, students=30, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 9, 1)
+    names = [f"Uczeń {i} Żółkiewski" for i in range(students)]
+
+    return [
+        {
+            "task_id": task_id,
+            "question": f"Uzupełnij zdanie numer {task_id}: Ich ___ gestern ins Kino gegangen.",
+            "main_category": "Grammatik",
+            "sub_category": "Perfekt",
+            "task_type": "fill_in",
+            "level": "A2",
+            "students_count": students,
+            "task_points": rng.randint(0, students * 10),
+            "task_error": rng.randint(0, students * 3),
+            "task_uncertainty": rng.randint(0, students * 2),
+            "time_spent": rng.randint(0, students * 300),
+            "difficulty": round(rng.uniform(1, 5), 1),
+            "student_results": [
+                {
+                    "user_id": f"00000000-0000-0000-0000-{user:012d}",
+                    "student_name": names[user],
+                    "task_points": rng.randint(0, 10),
+                    "task_error": rng.randint(0, 3),
+                    "task_uncertainty": rng.randint(0, 2),
+                    "time_spent": rng.randint(5, 300),
+                    "difficulty": rng.randint(1, 5),
+                    "completion_date": (start + timedelta(minutes=rng.randint(0, 90000))).isoformat(),
+                }
+                for user in range(students)
+            ],
+        }
+        for task_id in range(tasks)
+    ]
+
+
+def make_class_analytics(lessons=40, students=30, seed=1):
+    rng = random.Random(seed)
+
+    return {
+        "class_id": "c1",
+        "class_name": "Klasa 2b",
+        "lessons": [
+            {
+                "lesson_id": lesson_id,
+                "lesson_name": f"Lekcja {lesson_id}: Wochenende",
+                "main_category": "Lesen",
+                "sub_category": "Alltag",
+                "difficulty": {str(i): rng.randint(0, students) for i in range(1, 6)},
+                "time_on_page": round(rng.uniform(30, 600), 1),
+                "expected_time": round(rng.uniform(30, 600), 1),
+                "engagement_score": round(rng.uniform(0, 100), 1),
+                "users": [
+                    {
+                        "user_id": f"00000000-0000-0000-0000-{user:012d}",
+                        "user_name": f"Uczeń {user}",
+                        "time_on_page": rng.randint(10, 900),
+                        "difficulty": rng.randint(1, 5),
+                        "engagement_score": round(rng.uniform(0, 100), 2),
+                    }
+                    for user in range(students)
+                ],
+            }
+            for lesson_id in range(lessons)
+        ],
+    }
+
+
+def measure(provider, payload):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        body = provider.response(payload).get_data()
+    return (time.perf_counter() - start) / REPEATS, len(body)
+
+
+def run():
+    app = Flask(__name__)
+    providers = {
+        "Flask (domyślny)": DefaultJSONProvider(app),
+        "FastJSONProvider (stdlib)": FastJSONProvider(app, backend="stdlib"),
+    }
+    if orjson is not None:
+        providers["FastJSONProvider (orjson)"] = FastJSONProvider(app, backend="orjson")
+
+    payloads = {
+        "get_task_analytics": make_task_analytics(),
+        "get_class_analytics": make_class_analytics(),
+    }
+
+    for name, payload in payloads.items():
+        print(name)
+        baseline = None
+        for label, provider in providers.items():
+            elapsed, size = measure(provider, payload)
+            baseline = baseline or elapsed
+            print(f"  {label:<28} {elapsed * 1000:7.2f} ms, {size / 1024:6.1f} KiB, x{baseline / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    run()
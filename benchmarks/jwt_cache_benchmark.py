@@ -0,0 +1,70 @@
+"""Koszt decode_jwt_token z cache zweryfikowanych tokenów i bez niego.
+
+Symuluje ruch z dashboardu: każdy użytkownik otwiera kilka stron, a każda
+strona wysyła kilka requestów z tym samym tokenem.
+
+Uruchomienie: python -m benchmarks.jwt_cache_benchmark
+"""
+import datetime
+import os
+import random
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import jwt
+
+from app.services import jwt_check
+from app.services.jwt_check import decode_jwt_token, token_cache
+
+USERS = 300
+PAGE_VIEWS_PER_USER = 20
+REQUESTS_PER_PAGE = (3, 8)
+
+
+def make_headers(seed=0):
+    rng = random.Random(seed)
+    expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=24)
+    tokens = [
+        jwt.encode({"sub": f"user-{i}", "email": f"user{i}@example.com", "exp": expiration},
+                   jwt_check.SECRET_KEY, algorithm="HS256")
+        for i in range(USERS)
+    ]
+
+    headers = []
+    for _ in range(USERS * PAGE_VIEWS_PER_USER):
+        token = rng.choice(tokens)
+        headers.extend([f"Bearer {token}"] * rng.randint(*REQUESTS_PER_PAGE))
+    return headers
+
+
+def measure(headers):
+    start = time.perf_counter()
+    for header in headers:
+        payload, error, _ = decode_jwt_token(header)
+        assert error is None, error
+    return time.perf_counter() - start
+
+
+def run():
+    headers = make_headers()
+
+    token_cache.max_entries = 0
+    uncached = measure(headers)
+
+    token_cache.max_entries = jwt_check.JWT_CACHE_MAX_ENTRIES
+    token_cache.clear()
+    token_cache.hits = token_cache.misses = 0
+    cached = measure(headers)
+
+    per_request_uncached = uncached / len(headers) * 1e6
+    per_request_cached = cached / len(headers) * 1e6
+    print(f"{len(headers)} requestów, {USERS} użytkowników")
+    print(f"bez cache: {per_request_uncached:6.1f} µs/request")
+    print(f"z cache:   {per_request_cached:6.1f} µs/request "
+          f"(oszczędność {per_request_uncached - per_request_cached:.1f} µs, x{uncached / cached:.1f})")
+    print(f"statystyki cache: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,9 @@
+-- Wynik zaangażowania liczony przy zapisie zdarzenia (create_lesson_analytics).
+-- Wiersze sprzed migracji uzupełnia: flask --app run backfill-engagement
+
+alter table lesson_analytics
+    add column if not exists engagement_score numeric(5, 2),
+    add column if not exists engagement_version smallint;
+
+create index if not exists lesson_analytics_engagement_version_idx
+    on lesson_analytics (engagement_version);
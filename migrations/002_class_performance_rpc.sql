@@ -0,0 +1,81 @@
+-- Agregacje wyników po stronie Postgresa, wywoływane przez supabase.rpc.
+-- Bez tych funkcji endpointy analityczne liczą to samo w Pythonie (app/services/rpc.py).
+
+-- /analytics/get_class_performance_analysis
+create or replace function class_performance_by_subcategory(
+    p_class_id user_classes.class_id%type,
+    p_level tasks.level%type
+)
+returns table (
+    main_category text,
+    sub_category text,
+    total_points numeric,
+    total_possible numeric,
+    total_errors numeric,
+    total_uncertainty numeric,
+    total_difficulty numeric,
+    total_tasks bigint
+)
+language sql
+stable
+as $$
+    select
+        t.main_category::text,
+        t.sub_category::text,
+        sum(tr.task_points)::numeric,
+        sum(tr.task_points + tr.task_error + tr.task_uncertainty)::numeric,
+        sum(tr.task_error)::numeric,
+        sum(tr.task_uncertainty)::numeric,
+        sum(coalesce(tr.difficulty, 3))::numeric,
+        count(*)
+    from task_results tr
+    join tasks t on t.id = tr.task_id
+    where t.level = p_level
+      and tr.user_id in (
+          select uc.user_id from user_classes uc where uc.class_id = p_class_id
+      )
+    group by t.main_category, t.sub_category;
+$$;
+
+-- /analytics/get_task_analytics?details=false
+create or replace function class_task_summary(p_class_id task_results.class_id%type)
+returns table (
+    task_id task_results.task_id%type,
+    question text,
+    main_category text,
+    sub_category text,
+    task_type text,
+    level text,
+    students_count bigint,
+    task_points numeric,
+    task_error numeric,
+    task_uncertainty numeric,
+    time_spent numeric,
+    difficulty numeric
+)
+language sql
+stable
+as $$
+    select
+        tr.task_id,
+        coalesce(t.question, '')::text,
+        coalesce(t.main_category, '')::text,
+        coalesce(t.sub_category, '')::text,
+        coalesce(t.task_type, '')::text,
+        coalesce(t.level, '')::text,
+        count(distinct tr.user_id),
+        coalesce(sum(tr.task_points), 0)::numeric,
+        coalesce(sum(tr.task_error), 0)::numeric,
+        coalesce(sum(tr.task_uncertainty), 0)::numeric,
+        coalesce(sum(tr.time_spent), 0)::numeric,
+        coalesce(round(avg(tr.difficulty)::numeric, 1), 3.0)
+    from task_results tr
+    join tasks t on t.id = tr.task_id
+    join users u on u.id = tr.user_id
+    where tr.class_id = p_class_id
+    group by tr.task_id, t.question, t.main_category, t.sub_category, t.task_type, t.level
+    order by 3, 6, 2;
+$$;
+
+create index if not exists task_results_class_id_idx on task_results (class_id);
+create index if not exists task_results_user_id_idx on task_results (user_id);
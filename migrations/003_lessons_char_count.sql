@@ -0,0 +1,10 @@
+-- Liczba znaków treści lekcji, zapisywana przez create_lesson / update_lesson.
+-- should_send_lesson_metrics bierze ją z bazy po lessonId, więc frontend nie musi
+-- wysyłać całej treści lekcji z każdym zdarzeniem analitycznym.
+
+alter table lessons
+    add column if not exists char_count integer;
+
+update lessons
+set char_count = char_length(coalesce(context, ''))
+where char_count is null;
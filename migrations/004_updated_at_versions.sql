@@ -0,0 +1,47 @@
+-- Wersje wierszy dla ETagów (get_lesson, get_task, get_task_items).
+-- updated_at jest ustawiane przez triggery, a każda zmiana task_items
+-- podbija updated_at zadania, do którego należą.
+
+alter table lessons
+    add column if not exists updated_at timestamptz not null default now();
+
+alter table tasks
+    add column if not exists updated_at timestamptz not null default now();
+
+create or replace function set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists lessons_set_updated_at on lessons;
+create trigger lessons_set_updated_at
+    before update on lessons
+    for each row execute function set_updated_at();
+
+drop trigger if exists tasks_set_updated_at on tasks;
+create trigger tasks_set_updated_at
+    before update on tasks
+    for each row execute function set_updated_at();
+
+create or replace function touch_task_from_items()
+returns trigger
+language plpgsql
+as $$
+begin
+    update tasks
+    set updated_at = now()
+    where id = coalesce(new.task_id, old.task_id)
+       or (tg_op = 'UPDATE' and id = old.task_id);
+    return null;
+end;
+$$;
+
+drop trigger if exists task_items_touch_task on task_items;
+create trigger task_items_touch_task
+    after insert or update or delete on task_items
+    for each row execute function touch_task_from_items();
@@ -0,0 +1,4 @@
+-- Stronicowanie get_task_analytics?stream=true po kluczu (task_id, id) w obrębie klasy.
+-- Każda strona to zakres indeksu zamiast przeskakiwania offsetu wierszy.
+
+create index if not exists task_results_class_task_id_idx on task_results (class_id, task_id, id);
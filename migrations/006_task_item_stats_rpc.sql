@@ -0,0 +1,57 @@
+-- /analytics/get_task_item_analytics i /analytics/get_task_items_analytics:
+-- statystyki odpowiedzi pozycji zadań klasy policzone w Postgresie, bez pobierania
+-- wszystkich task_results i answer_items (PostgREST obcina odpowiedzi do max-rows).
+-- Zwracane są tylko pozycje zadań, które mają wyniki w klasie.
+
+create or replace function class_task_item_stats(
+    p_class_id task_results.class_id%type,
+    p_task_ids text[]
+)
+returns table (
+    task_id task_items.task_id%type,
+    item_id task_items.id%type,
+    template task_items.template%type,
+    bonus_information task_items.bonus_information%type,
+    correct_answer task_items.correct_answer%type,
+    total_answers bigint,
+    correct bigint,
+    incorrect bigint,
+    uncertain bigint
+)
+language sql
+stable
+as $$
+    with class_results as (
+        select tr.id, tr.task_id
+        from task_results tr
+        where tr.class_id = p_class_id
+          and tr.task_id::text = any(p_task_ids)
+    ),
+    answers as (
+        select
+            ai.item_id,
+            count(*) as total_answers,
+            coalesce(sum(ai.point::int), 0) as correct,
+            coalesce(sum(ai.error::int), 0) as incorrect,
+            coalesce(sum(ai.uncertain::int), 0) as uncertain
+        from answer_items ai
+        join class_results cr on cr.id = ai.task_result_id
+        group by ai.item_id
+    )
+    select
+        ti.task_id,
+        ti.id,
+        ti.template,
+        ti.bonus_information,
+        ti.correct_answer,
+        coalesce(a.total_answers, 0),
+        coalesce(a.correct, 0),
+        coalesce(a.incorrect, 0),
+        coalesce(a.uncertain, 0)
+    from task_items ti
+    left join answers a on a.item_id = ti.id
+    where ti.task_id in (select cr.task_id from class_results cr)
+    order by ti.task_id, ti.id;
+$$;
+
+create index if not exists answer_items_task_result_id_idx on answer_items (task_result_id);
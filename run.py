@@ -1,6 +1,8 @@
 from app import create_app
 
-app = create_app()
+# Procesy robocze haseł (forkserver/spawn) importują ten plik jako __mp_main__ - bez budowania aplikacji
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True)